@@ -3,12 +3,8 @@ Demo Scenario: The Cursed Tavern
 A complete example campaign showcasing all game features.
 """
 
-from src.agent import GameMasterAgent
-from src.character import create_character, get_character_summary
-from src.content_generator import generate_location, generate_combat_encounter
-from src.combat_system import create_enemy, CombatManager
-from src.state_manager import GameStateManager
 import os
+from src.character import create_character, get_character_summary
 
 
 def run_demo_scenario():
@@ -26,6 +22,9 @@ def run_demo_scenario():
         print("Please set it before running the demo.")
         return
     
+    # Deferred so the missing-key path doesn't pay for importing google.genai
+    from src.agent import GameMasterAgent
+    
     # Create character
     print("Step 1: Character Creation")
     print("-" * 60)
@@ -77,6 +76,7 @@ def run_demo_scenario():
     print("Demo scenario setup complete!")
     print("=" * 60)
     print("\nTo run the full interactive demo, use the notebook.ipynb file.")
+    agent.close()
 
 
 if __name__ == "__main__":
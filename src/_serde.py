@@ -0,0 +1,121 @@
+"""
+Game Master Agent - Serialization Helpers
+JSON encoding/decoding backed by orjson when it is installed, and
+atomic file writes for saves.
+
+orjson is an optional speedup; both backends produce the same JSON.
+"""
+
+import dataclasses
+import datetime
+import enum
+import json
+import os
+import uuid
+from collections import deque
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # fall back to the standard library
+    orjson = None  # type: ignore[assignment]
+
+# Separators for compact stdlib output (orjson is compact by default)
+_COMPACT = (",", ":")
+
+
+def _default(obj: Any) -> Any:
+    """
+    Encode types JSON has no native form for (bounded histories, read-only views).
+    
+    Also covers the types orjson encodes natively (dataclasses, dates and
+    times, UUIDs, enums), so the stdlib fallback accepts the same objects.
+    """
+    if isinstance(obj, deque):
+        return list(obj)
+    if isinstance(obj, MappingProxyType):
+        return dict(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return {field.name: getattr(obj, field.name) for field in dataclasses.fields(obj)}
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """
+    Serialize an object to a JSON string.
+    
+    Args:
+        obj: Object to serialize
+        indent: Pretty-print with two-space indentation
+    
+    Returns:
+        JSON string
+    """
+    return dumpb(obj, indent).decode("utf-8")
+
+
+def dumpb(obj: Any, indent: bool = False) -> bytes:
+    """
+    Serialize an object to UTF-8 encoded JSON bytes, ready for a binary file.
+    
+    Args:
+        obj: Object to serialize
+        indent: Pretty-print with two-space indentation
+    
+    Returns:
+        JSON bytes
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False, default=_default).encode("utf-8")
+    return json.dumps(obj, separators=_COMPACT, ensure_ascii=False, default=_default).encode("utf-8")
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    Deserialize a JSON document.
+    
+    Args:
+        data: JSON string or UTF-8 bytes
+    
+    Returns:
+        Deserialized object
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def write_atomic(path: Union[str, "os.PathLike[str]"], data: bytes) -> None:
+    """
+    Write bytes to a file through a temporary file and an atomic rename.
+    
+    Readers see either the previous file or the complete new one, never a
+    partially written file.
+    
+    Args:
+        path: Destination file
+        data: File contents
+    """
+    tmp_path = Path(f"{os.fspath(path)}.tmp")
+    try:
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            tmp_path.unlink()
+        except FileNotFoundError:
+            pass
+        raise
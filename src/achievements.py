@@ -3,29 +3,110 @@ Game Master Agent - Achievements System
 Tracks player achievements and milestones.
 """
 
-from typing import Dict, Any, List, Optional
+import copy
+import math
+from array import array
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Dict, Any, List, Mapping, Optional, Set, Tuple
 from datetime import datetime
+from types import MappingProxyType
+
+
+# Achievement tiers per milestone, sorted by ascending threshold
+_MILESTONE_THRESHOLDS: Dict[str, Tuple[Tuple[int, str, str, str], ...]] = {
+    "enemies_defeated": (
+        (1, "first_blood", "First Blood", "Defeat your first enemy"),
+        (10, "warrior", "Warrior", "Defeat 10 enemies"),
+        (50, "slayer", "Slayer", "Defeat 50 enemies"),
+        (100, "legend", "Legend", "Defeat 100 enemies")
+    ),
+    "quests_completed": (
+        (1, "adventurer", "Adventurer", "Complete your first quest"),
+        (5, "hero", "Hero", "Complete 5 quests"),
+        (10, "champion", "Champion", "Complete 10 quests"),
+        (25, "master", "Master", "Complete 25 quests")
+    ),
+    "npcs_met": (
+        (5, "social", "Social Butterfly", "Meet 5 NPCs"),
+        (15, "networker", "Networker", "Meet 15 NPCs"),
+        (30, "diplomat", "Diplomat", "Meet 30 NPCs")
+    ),
+    "gold_earned": (
+        (100, "wealthy", "Wealthy", "Earn 100 gold"),
+        (500, "rich", "Rich", "Earn 500 gold"),
+        (1000, "tycoon", "Tycoon", "Earn 1000 gold")
+    ),
+    "levels_gained": (
+        (2, "rising", "Rising Star", "Reach level 2"),
+        (5, "experienced", "Experienced", "Reach level 5"),
+        (10, "veteran", "Veteran", "Reach level 10")
+    )
+}
+
+
+# Fixed slot layout for the milestone counters
+_MILESTONE_INDEX: Dict[str, int] = {
+    "enemies_defeated": 0,
+    "quests_completed": 1,
+    "npcs_met": 2,
+    "locations_discovered": 3,
+    "gold_earned": 4,
+    "levels_gained": 5,
+    "critical_hits": 6,
+    "skill_checks_passed": 7
+}
+
+
+@dataclass
+class Achievement:
+    """An unlocked achievement."""
+    __slots__ = ("id", "name", "description", "category", "unlocked_at")
+    
+    id: str
+    name: str
+    description: str
+    category: str
+    unlocked_at: str
 
 
 class AchievementsSystem:
     """Manages player achievements and milestones."""
     
-    def __init__(self):
+    def __init__(self) -> None:
         """Initialize the achievements system."""
-        self.achievements: List[Dict[str, Any]] = []
-        self.milestones: Dict[str, Any] = {
-            "enemies_defeated": 0,
-            "quests_completed": 0,
-            "npcs_met": 0,
-            "locations_discovered": 0,
-            "gold_earned": 0,
-            "levels_gained": 0,
-            "critical_hits": 0,
-            "skill_checks_passed": 0
+        self.achievements: List[Achievement] = []
+        self._unlocked_ids: Set[str] = set()  # index over achievements for O(1) lookups
+        self._by_category: Dict[str, int] = {}  # category -> number of unlocked achievements
+        self._milestone_values = array('q', [0] * len(_MILESTONE_INDEX))
+        # Lowest threshold per milestone that could still unlock something
+        self._next_threshold: Dict[str, float] = {
+            milestone: tiers[0][0] if tiers else math.inf
+            for milestone, tiers in _MILESTONE_THRESHOLDS.items()
         }
     
+    @property
+    def milestones(self) -> Mapping[str, int]:
+        """Read-only view of the milestone counters; use update_milestone() to change them."""
+        return MappingProxyType(self._milestone_dict())
+    
+    @milestones.setter
+    def milestones(self, milestones: Mapping[str, int]) -> None:
+        values = array('q', [0] * len(_MILESTONE_INDEX))
+        for name, value in milestones.items():
+            idx = _MILESTONE_INDEX.get(name)
+            if idx is not None:
+                values[idx] = int(value)
+        self._milestone_values = values
+    
+    def _milestone_dict(self) -> Dict[str, int]:
+        """Milestone counters as a freshly built dictionary."""
+        values = self._milestone_values
+        return {name: values[idx] for name, idx in _MILESTONE_INDEX.items()}
+    
     def unlock_achievement(self, achievement_id: str, name: str, 
-                         description: str, category: str = "general") -> Dict[str, Any]:
+                         description: str, category: str = "general",
+                         unlocked_at: Optional[str] = None) -> Dict[str, Any]:
         """
         Unlock an achievement.
         
@@ -34,27 +115,30 @@ class AchievementsSystem:
             name: Achievement name
             description: Achievement description
             category: Achievement category
+            unlocked_at: ISO timestamp of the unlock (defaults to now)
         
         Returns:
             Achievement dictionary
         """
         # Check if already unlocked
-        if any(a["id"] == achievement_id for a in self.achievements):
+        if achievement_id in self._unlocked_ids:
             return {"success": False, "error": "Achievement already unlocked"}
         
-        achievement = {
-            "id": achievement_id,
-            "name": name,
-            "description": description,
-            "category": category,
-            "unlocked_at": datetime.now().isoformat()
-        }
+        achievement = Achievement(
+            id=achievement_id,
+            name=name,
+            description=description,
+            category=category,
+            unlocked_at=unlocked_at or datetime.now().isoformat()
+        )
         
         self.achievements.append(achievement)
+        self._unlocked_ids.add(achievement_id)
+        self._by_category[category] = self._by_category.get(category, 0) + 1
         
         return {
             "success": True,
-            "achievement": achievement,
+            "achievement": asdict(achievement),
             "message": f"🏆 Achievement Unlocked: {name}!"
         }
     
@@ -69,100 +153,96 @@ class AchievementsSystem:
         Returns:
             Update result
         """
-        if milestone in self.milestones:
-            self.milestones[milestone] += amount
-            
-            # Check for milestone-based achievements
+        idx = _MILESTONE_INDEX.get(milestone)
+        if idx is None:
+            return {"success": False, "error": f"Unknown milestone: {milestone}"}
+        
+        self._milestone_values[idx] += int(amount)
+        value = self._milestone_values[idx]
+        
+        # Check for milestone-based achievements, unless no tier can be reached yet
+        if value >= self._next_threshold.get(milestone, math.inf):
             self._check_milestone_achievements(milestone)
-            
-            return {
-                "success": True,
-                "milestone": milestone,
-                "value": self.milestones[milestone]
-            }
         
-        return {"success": False, "error": f"Unknown milestone: {milestone}"}
+        return {
+            "success": True,
+            "milestone": milestone,
+            "value": value
+        }
     
-    def _check_milestone_achievements(self, milestone: str):
+    def _check_milestone_achievements(self, milestone: str) -> None:
         """Check if milestones trigger achievements."""
-        value = self.milestones[milestone]
+        value = self._milestone_values[_MILESTONE_INDEX[milestone]]
+        unlocked_at: Optional[str] = None  # one timestamp shared by every tier crossed in this update
         
-        # Define achievement thresholds
-        thresholds = {
-            "enemies_defeated": [
-                (1, "first_blood", "First Blood", "Defeat your first enemy"),
-                (10, "warrior", "Warrior", "Defeat 10 enemies"),
-                (50, "slayer", "Slayer", "Defeat 50 enemies"),
-                (100, "legend", "Legend", "Defeat 100 enemies")
-            ],
-            "quests_completed": [
-                (1, "adventurer", "Adventurer", "Complete your first quest"),
-                (5, "hero", "Hero", "Complete 5 quests"),
-                (10, "champion", "Champion", "Complete 10 quests"),
-                (25, "master", "Master", "Complete 25 quests")
-            ],
-            "npcs_met": [
-                (5, "social", "Social Butterfly", "Meet 5 NPCs"),
-                (15, "networker", "Networker", "Meet 15 NPCs"),
-                (30, "diplomat", "Diplomat", "Meet 30 NPCs")
-            ],
-            "gold_earned": [
-                (100, "wealthy", "Wealthy", "Earn 100 gold"),
-                (500, "rich", "Rich", "Earn 500 gold"),
-                (1000, "tycoon", "Tycoon", "Earn 1000 gold")
-            ],
-            "levels_gained": [
-                (2, "rising", "Rising Star", "Reach level 2"),
-                (5, "experienced", "Experienced", "Reach level 5"),
-                (10, "veteran", "Veteran", "Reach level 10")
-            ]
-        }
+        for threshold, achievement_id, name, description in _MILESTONE_THRESHOLDS.get(milestone, ()):
+            # Tiers are sorted, so nothing past the first unmet threshold can unlock
+            if value < threshold:
+                break
+            if achievement_id not in self._unlocked_ids:
+                if unlocked_at is None:
+                    unlocked_at = datetime.now().isoformat()
+                self.unlock_achievement(achievement_id, name, description, "milestone", unlocked_at)
         
-        if milestone in thresholds:
-            for threshold, achievement_id, name, description in thresholds[milestone]:
-                if value >= threshold:
-                    # Check if already unlocked
-                    if not any(a["id"] == achievement_id for a in self.achievements):
-                        self.unlock_achievement(achievement_id, name, description, "milestone")
+        self._refresh_next_threshold(milestone)
     
-    def get_achievements_by_category(self, category: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get achievements, optionally filtered by category."""
+    def _refresh_next_threshold(self, milestone: str) -> None:
+        """Recompute the lowest threshold whose achievement is still locked."""
+        self._next_threshold[milestone] = next(
+            (threshold for threshold, achievement_id, _, _ in _MILESTONE_THRESHOLDS[milestone]
+             if achievement_id not in self._unlocked_ids),
+            math.inf
+        )
+    
+    def get_achievements_by_category(self, category: Optional[str] = None) -> List[Achievement]:
+        """
+        Get achievements, optionally filtered by category.
+        
+        Without a category the internal list is returned as-is; treat it as read-only.
+        """
         if category:
-            return [a for a in self.achievements if a["category"] == category]
-        return self.achievements.copy()
+            return [a for a in self.achievements if a.category == category]
+        return self.achievements
     
     def get_statistics(self) -> Dict[str, Any]:
         """Get achievement statistics."""
-        total = len(self.achievements)
-        by_category = {}
-        for achievement in self.achievements:
-            cat = achievement["category"]
-            by_category[cat] = by_category.get(cat, 0) + 1
-        
         return {
-            "total_achievements": total,
-            "by_category": by_category,
-            "milestones": self.milestones.copy()
+            "total_achievements": len(self.achievements),
+            "by_category": dict(self._by_category),
+            "milestones": self._milestone_dict()
         }
     
     def to_dict(self) -> Dict[str, Any]:
-        """Convert achievements system to dictionary."""
+        """
+        Convert achievements system to dictionary.
+        
+        Achievement records are fresh dicts but their values are shared;
+        use snapshot() for an independent copy.
+        """
         return {
-            "achievements": self.achievements.copy(),
-            "milestones": self.milestones.copy()
+            "achievements": [asdict(a) for a in self.achievements],
+            "milestones": self._milestone_dict()
         }
     
-    def from_dict(self, data: Dict[str, Any]):
+    def snapshot(self) -> Dict[str, Any]:
+        """Get an independent deep copy of the achievements system for save games."""
+        return copy.deepcopy(self.to_dict())
+    
+    def from_dict(self, data: Dict[str, Any]) -> None:
         """Load achievements system from dictionary."""
-        self.achievements = data.get("achievements", [])
-        self.milestones = data.get("milestones", {
-            "enemies_defeated": 0,
-            "quests_completed": 0,
-            "npcs_met": 0,
-            "locations_discovered": 0,
-            "gold_earned": 0,
-            "levels_gained": 0,
-            "critical_hits": 0,
-            "skill_checks_passed": 0
-        })
+        self.achievements = [
+            Achievement(
+                id=a["id"],
+                name=a.get("name", a["id"]),
+                description=a.get("description", ""),
+                category=a.get("category", "general"),
+                unlocked_at=a.get("unlocked_at", "")
+            )
+            for a in data.get("achievements", [])
+        ]
+        self._unlocked_ids = {a.id for a in self.achievements}
+        self._by_category = dict(Counter(a.category for a in self.achievements))
+        self.milestones = data.get("milestones", {})
+        for milestone in _MILESTONE_THRESHOLDS:
+            self._refresh_next_threshold(milestone)
 
@@ -4,9 +4,13 @@ Uses Google GenAI/ADK to create an intelligent Dungeon Master agent.
 """
 
 import os
-from typing import Dict, Any, Optional, List
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Generator, Deque, Tuple
 from google import genai
-from google.genai import types
+from google.genai import errors, types
 
 from src.tools import (
     roll_dice, perform_attack, skill_check, update_character_stat,
@@ -15,7 +19,7 @@ from src.tools import (
 from src.state_manager import GameStateManager
 from src.content_generator import (
     generate_npc, create_quest, generate_location, 
-    generate_combat_encounter, generate_puzzle
+    generate_combat_encounter, generate_puzzle, preload_templates
 )
 from src.combat_system import CombatManager, create_enemy
 from src.reputation import ReputationSystem
@@ -69,6 +73,92 @@ STATE MANAGEMENT:
 
 Be creative, fair, and make the adventure memorable!"""
 
+# How long the cached system prompt + tool schema lives on the server
+CACHE_TTL_SECONDS = 3600
+
+# How long to wait before retrying cache creation after a transient failure
+CACHE_RETRY_SECONDS = 60
+
+# Number of recent messages sent to the model as context
+CONTEXT_WINDOW_MESSAGES = 10
+
+# Number of messages kept in the agent's conversation history
+HISTORY_MAX_MESSAGES = 256
+
+# Tool schemas: (name, description, {parameter: (type, description, required)})
+_TOOL_SCHEMAS = [
+    ("roll_dice",
+     "Roll dice using D&D notation (e.g., '1d20', '2d6+3'). Use this for all random checks, attacks, and skill checks.",
+     {
+         "notation": (types.Type.STRING, "Dice notation (e.g., '1d20', '2d6+3', '1d8-1')", True)
+     }),
+    ("perform_attack",
+     "Perform an attack roll and calculate damage. Use during combat encounters.",
+     {
+         "attacker": (types.Type.OBJECT, "Attacker character dictionary", True),
+         "defender": (types.Type.OBJECT, "Defender character dictionary", True),
+         "weapon": (types.Type.STRING, "Weapon name (optional)", False)
+     }),
+    ("skill_check",
+     "Perform a skill check against a difficulty class (DC). Use for perception, stealth, persuasion, etc.",
+     {
+         "skill": (types.Type.STRING, "Skill name (e.g., 'perception', 'stealth', 'persuasion')", True),
+         "difficulty": (types.Type.INTEGER, "Difficulty class (DC) to beat", True),
+         "modifiers": (types.Type.OBJECT, "Character stats and modifiers", True)
+     }),
+    ("update_character_stat",
+     "Update a character's stat (HP, stats, inventory, etc.). Use to track character changes.",
+     {
+         "character": (types.Type.OBJECT, "Character dictionary", True),
+         "stat": (types.Type.STRING, "Stat name (e.g., 'hp.current', 'stats.strength', 'inventory')", True),
+         "value": (types.Type.STRING, "New value or operation (e.g., '50', '+10', '-5')", True)
+     }),
+    ("save_game",
+     "Save the current game state to a file. Use after important story beats.",
+     {
+         "state": (types.Type.OBJECT, "Game state dictionary", True),
+         "filename": (types.Type.STRING, "Filename to save to", True)
+     }),
+    ("load_game",
+     "Load a game state from a file.",
+     {
+         "filename": (types.Type.STRING, "Filename to load from", True)
+     }),
+    ("generate_npc",
+     "Generate an NPC with personality and dialogue. Use when introducing new characters.",
+     {
+         "context": (types.Type.STRING, "Story context for the NPC", True),
+         "role": (types.Type.STRING, "NPC role (e.g., 'tavern_owner', 'guard', 'merchant')", True)
+     }),
+    ("create_quest",
+     "Create a new quest. Use when the player receives a quest.",
+     {
+         "difficulty": (types.Type.STRING, "Quest difficulty ('easy', 'medium', 'hard')", True),
+         "theme": (types.Type.STRING, "Quest theme or template name", True)
+     })
+]
+
+
+def _make_decl(name: str, description: str,
+               params: Dict[str, Tuple[Any, str, bool]]) -> types.FunctionDeclaration:
+    """Build a FunctionDeclaration from a compact schema row."""
+    return types.FunctionDeclaration(
+        name=name,
+        description=description,
+        parameters=types.Schema(
+            type=types.Type.OBJECT,
+            properties={
+                param: types.Schema(type=param_type, description=param_description)
+                for param, (param_type, param_description, _) in params.items()
+            },
+            required=[param for param, (_, _, required) in params.items() if required]
+        )
+    )
+
+
+# Tool declarations are immutable, so build them once at import
+_TOOL_DECLS = [_make_decl(*row) for row in _TOOL_SCHEMAS]
+
 
 class GameMasterAgent:
     """Main Game Master agent using Google GenAI/ADK."""
@@ -107,8 +197,21 @@ class GameMasterAgent:
         # Initialize achievements system
         self.achievements = AchievementsSystem()
         
+        # Parse content templates now rather than on the first generated NPC/quest
+        preload_templates()
+        
         # Initialize conversation history
-        self.conversation_history: List[Dict[str, Any]] = []
+        self.conversation_history: Deque[Dict[str, Any]] = deque(maxlen=HISTORY_MAX_MESSAGES)
+        
+        # Recent history as request-ready Content objects, built once per message
+        self._contents: Deque[types.Content] = deque(maxlen=CONTEXT_WINDOW_MESSAGES)
+        
+        # (rendered state fields, state context) from the last rebuild
+        self._state_context_cache: Optional[Tuple[Optional[Tuple[Any, ...]], str]] = None
+        
+        # Worker pool for running independent tool calls in parallel
+        self._tool_pool = ThreadPoolExecutor(max_workers=4)
+        self._state_lock = threading.Lock()  # serializes save/load against the state manager
         
         # Create agent with tools
         self._setup_agent()
@@ -116,160 +219,84 @@ class GameMasterAgent:
     def _setup_agent(self):
         """Set up the agent with tools and system prompt."""
         # Define tools for the agent
-        self.tools = [
-            types.Tool(
-                function_declarations=[
-                    types.FunctionDeclaration(
-                        name="roll_dice",
-                        description="Roll dice using D&D notation (e.g., '1d20', '2d6+3'). Use this for all random checks, attacks, and skill checks.",
-                        parameters=types.Schema(
-                            type=types.Type.OBJECT,
-                            properties={
-                                "notation": types.Schema(
-                                    type=types.Type.STRING,
-                                    description="Dice notation (e.g., '1d20', '2d6+3', '1d8-1')"
-                                )
-                            },
-                            required=["notation"]
-                        )
-                    ),
-                    types.FunctionDeclaration(
-                        name="perform_attack",
-                        description="Perform an attack roll and calculate damage. Use during combat encounters.",
-                        parameters=types.Schema(
-                            type=types.Type.OBJECT,
-                            properties={
-                                "attacker": types.Schema(
-                                    type=types.Type.OBJECT,
-                                    description="Attacker character dictionary"
-                                ),
-                                "defender": types.Schema(
-                                    type=types.Type.OBJECT,
-                                    description="Defender character dictionary"
-                                ),
-                                "weapon": types.Schema(
-                                    type=types.Type.STRING,
-                                    description="Weapon name (optional)"
-                                )
-                            },
-                            required=["attacker", "defender"]
-                        )
-                    ),
-                    types.FunctionDeclaration(
-                        name="skill_check",
-                        description="Perform a skill check against a difficulty class (DC). Use for perception, stealth, persuasion, etc.",
-                        parameters=types.Schema(
-                            type=types.Type.OBJECT,
-                            properties={
-                                "skill": types.Schema(
-                                    type=types.Type.STRING,
-                                    description="Skill name (e.g., 'perception', 'stealth', 'persuasion')"
-                                ),
-                                "difficulty": types.Schema(
-                                    type=types.Type.INTEGER,
-                                    description="Difficulty class (DC) to beat"
-                                ),
-                                "modifiers": types.Schema(
-                                    type=types.Type.OBJECT,
-                                    description="Character stats and modifiers"
-                                )
-                            },
-                            required=["skill", "difficulty", "modifiers"]
-                        )
-                    ),
-                    types.FunctionDeclaration(
-                        name="update_character_stat",
-                        description="Update a character's stat (HP, stats, inventory, etc.). Use to track character changes.",
-                        parameters=types.Schema(
-                            type=types.Type.OBJECT,
-                            properties={
-                                "character": types.Schema(
-                                    type=types.Type.OBJECT,
-                                    description="Character dictionary"
-                                ),
-                                "stat": types.Schema(
-                                    type=types.Type.STRING,
-                                    description="Stat name (e.g., 'hp.current', 'stats.strength', 'inventory')"
-                                ),
-                                "value": types.Schema(
-                                    type=types.Type.STRING,
-                                    description="New value or operation (e.g., '50', '+10', '-5')"
-                                )
-                            },
-                            required=["character", "stat", "value"]
-                        )
-                    ),
-                    types.FunctionDeclaration(
-                        name="save_game",
-                        description="Save the current game state to a file. Use after important story beats.",
-                        parameters=types.Schema(
-                            type=types.Type.OBJECT,
-                            properties={
-                                "state": types.Schema(
-                                    type=types.Type.OBJECT,
-                                    description="Game state dictionary"
-                                ),
-                                "filename": types.Schema(
-                                    type=types.Type.STRING,
-                                    description="Filename to save to"
-                                )
-                            },
-                            required=["state", "filename"]
-                        )
-                    ),
-                    types.FunctionDeclaration(
-                        name="load_game",
-                        description="Load a game state from a file.",
-                        parameters=types.Schema(
-                            type=types.Type.OBJECT,
-                            properties={
-                                "filename": types.Schema(
-                                    type=types.Type.STRING,
-                                    description="Filename to load from"
-                                )
-                            },
-                            required=["filename"]
-                        )
-                    ),
-                    types.FunctionDeclaration(
-                        name="generate_npc",
-                        description="Generate an NPC with personality and dialogue. Use when introducing new characters.",
-                        parameters=types.Schema(
-                            type=types.Type.OBJECT,
-                            properties={
-                                "context": types.Schema(
-                                    type=types.Type.STRING,
-                                    description="Story context for the NPC"
-                                ),
-                                "role": types.Schema(
-                                    type=types.Type.STRING,
-                                    description="NPC role (e.g., 'tavern_owner', 'guard', 'merchant')"
-                                )
-                            },
-                            required=["context", "role"]
-                        )
-                    ),
-                    types.FunctionDeclaration(
-                        name="create_quest",
-                        description="Create a new quest. Use when the player receives a quest.",
-                        parameters=types.Schema(
-                            type=types.Type.OBJECT,
-                            properties={
-                                "difficulty": types.Schema(
-                                    type=types.Type.STRING,
-                                    description="Quest difficulty ('easy', 'medium', 'hard')"
-                                ),
-                                "theme": types.Schema(
-                                    type=types.Type.STRING,
-                                    description="Quest theme or template name"
-                                )
-                            },
-                            required=["difficulty", "theme"]
-                        )
-                    )
-                ]
+        self.tools = [types.Tool(function_declarations=_TOOL_DECLS)]
+        
+        # Map tool names to their implementations
+        self._tool_dispatch = {
+            "roll_dice": roll_dice,
+            "perform_attack": perform_attack,
+            "skill_check": skill_check,
+            "update_character_stat": update_character_stat,
+            "save_game": self._save_game_tool,
+            "load_game": self._load_game_tool,
+            "generate_npc": generate_npc,
+            "create_quest": create_quest
+        }
+        
+        # The system prompt and tools are registered as cached content on
+        # first use, so each turn only sends the conversation
+        self.cache = None
+        self._cache_expires_at = 0.0
+        self._cache_retry_at = 0.0
+        self._cache_supported = True
+    
+    def _get_cached_content(self) -> Optional[str]:
+        """
+        Get the cached system prompt + tools, creating it on first use and
+        re-creating it once the TTL expires.
+        
+        Returns:
+            Cached content name, or None if context caching is unavailable
+        """
+        if not self._cache_supported:
+            return None
+        
+        now = time.monotonic()
+        if self.cache is not None and now < self._cache_expires_at:
+            return self.cache.name
+        if now < self._cache_retry_at:
+            return None
+        
+        try:
+            cache = self.client.caches.create(
+                model=self.model,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=GM_SYSTEM_PROMPT,
+                    tools=self.tools,
+                    ttl=f"{CACHE_TTL_SECONDS}s"
+                )
             )
-        ]
+        except errors.APIError as e:
+            if e.code == 400:
+                # Model doesn't support caching or the prefix is below the
+                # minimum cacheable size - send the prompt inline from now on
+                self._cache_supported = False
+            else:
+                # Rate limits and server errors are transient; retry later
+                self._cache_retry_at = now + CACHE_RETRY_SECONDS
+            self._drop_cache()
+            return None
+        except Exception:
+            # Transport failures (timeouts, connection errors) are transient too
+            self._cache_retry_at = now + CACHE_RETRY_SECONDS
+            self._drop_cache()
+            return None
+        
+        self._drop_cache()
+        self.cache = cache
+        # Refresh a little early so requests never reference an expired cache
+        self._cache_expires_at = now + CACHE_TTL_SECONDS - 60
+        return cache.name
+    
+    def _drop_cache(self) -> None:
+        """Delete the current server-side cache, if any; failures are ignored."""
+        if self.cache is None:
+            return
+        try:
+            self.client.caches.delete(name=self.cache.name)
+        except Exception:
+            pass  # it expires on its own after the TTL
+        self.cache = None
     
     def _execute_tool(self, tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -282,25 +309,14 @@ class GameMasterAgent:
         Returns:
             Tool execution result
         """
-        tool_functions = {
-            "roll_dice": roll_dice,
-            "perform_attack": perform_attack,
-            "skill_check": skill_check,
-            "update_character_stat": update_character_stat,
-            "save_game": lambda state, filename: self.state_manager.save_state(state, filename),
-            "load_game": lambda filename: self.state_manager.load_state(filename),
-            "generate_npc": generate_npc,
-            "create_quest": create_quest
-        }
-        
-        if tool_name not in tool_functions:
+        func = self._tool_dispatch.get(tool_name)
+        if func is None:
             return {
                 "error": f"Unknown tool: {tool_name}",
                 "success": False
             }
         
         try:
-            func = tool_functions[tool_name]
             result = func(**args)
             return result
         except Exception as e:
@@ -309,6 +325,59 @@ class GameMasterAgent:
                 "success": False
             }
     
+    def _get_state_context(self, current_state: Optional[Dict[str, Any]]) -> str:
+        """
+        Get the state summary sent with each message, rebuilt only when a rendered field changes.
+        
+        The cache is keyed on the rendered values themselves, since combat and
+        callers update the state dicts in place without going through the
+        state manager.
+        
+        Args:
+            current_state: Current game state (or None)
+        
+        Returns:
+            State context string
+        """
+        key = None
+        if current_state:
+            char = current_state.get("character", {})
+            hp = char.get("hp", {})
+            key = (
+                char.get("name", "Unknown"),
+                char.get("level", 1),
+                hp.get("current", 0),
+                hp.get("max", 0),
+                current_state.get("current_location", "Unknown"),
+                len(current_state.get("active_quests", []))
+            )
+        
+        if self._state_context_cache is not None and self._state_context_cache[0] == key:
+            return self._state_context_cache[1]
+        
+        state_context = ""
+        if key is not None:
+            name, level, hp_current, hp_max, location, quest_count = key
+            state_context = f"""
+Current Character: {name} (Level {level})
+HP: {hp_current}/{hp_max}
+Location: {location}
+Active Quests: {quest_count}
+"""
+        
+        self._state_context_cache = (key, state_context)
+        return state_context
+    
+    def _save_game_tool(self, state: Dict[str, Any], filename: str) -> Dict[str, Any]:
+        """save_game tool: persist state through the agent's state manager."""
+        with self._state_lock:
+            return self.state_manager.save_state(state, filename)
+    
+    def _load_game_tool(self, filename: str) -> Dict[str, Any]:
+        """load_game tool: load state through the agent's state manager."""
+        with self._state_lock:
+            return self.state_manager.load_state(filename)
+    
     def start_session(self, character: Dict[str, Any], initial_prompt: str = ""):
         """
         Start a new game session.
@@ -321,95 +390,117 @@ class GameMasterAgent:
         state = self.state_manager.create_initial_state(character)
         
         # Add initial prompt to history
+        self.conversation_history.clear()
+        self._contents.clear()
         if initial_prompt:
-            self.conversation_history = [
-                {
-                    "role": "user",
-                    "content": initial_prompt
-                }
-            ]
-        else:
-            self.conversation_history = []
+            self.conversation_history.append({
+                "role": "user",
+                "content": initial_prompt
+            })
+            self._contents.append(
+                types.Content(role="user", parts=[types.Part.from_text(initial_prompt)])
+            )
     
-    def process_message(self, user_message: str) -> Dict[str, Any]:
+    def process_message_stream(self, user_message: str) -> Generator[str, None, Dict[str, Any]]:
         """
-        Process a user message and generate a response.
+        Process a user message, yielding response text as it is generated.
         
         Args:
             user_message: User's message/action
         
+        Yields:
+            Response text deltas as they arrive from the model
+        
         Returns:
-            Agent response dictionary
+            Agent response dictionary (as the generator's return value)
         """
         # Add user message to history
         self.conversation_history.append({
             "role": "user",
             "content": user_message
         })
+        self._contents.append(
+            types.Content(role="user", parts=[types.Part.from_text(user_message)])
+        )
         
         # Get current state for context
         current_state = self.state_manager.get_current_state()
-        state_context = ""
-        if current_state:
-            char = current_state.get("character", {})
-            state_context = f"""
-Current Character: {char.get('name', 'Unknown')} (Level {char.get('level', 1)})
-HP: {char.get('hp', {}).get('current', 0)}/{char.get('hp', {}).get('max', 0)}
-Location: {current_state.get('current_location', 'Unknown')}
-Active Quests: {len(current_state.get('active_quests', []))}
-"""
+        state_context = self._get_state_context(current_state)
         
-        # Prepare messages with system prompt
-        messages = [
-            types.Content(
-                role="user",
-                parts=[types.Part.from_text(GM_SYSTEM_PROMPT + "\n\n" + state_context)]
-            )
-        ]
+        # The system prompt and tools are served from the cache when available
+        cached_content = self._get_cached_content()
+        if cached_content:
+            context_text = state_context
+        else:
+            context_text = GM_SYSTEM_PROMPT + "\n\n" + state_context
         
-        # Add conversation history
-        for msg in self.conversation_history[-10:]:  # Last 10 messages for context
-            role = "user" if msg["role"] == "user" else "model"
+        messages = []
+        if context_text.strip():
             messages.append(
                 types.Content(
-                    role=role,
-                    parts=[types.Part.from_text(msg["content"])]
+                    role="user",
+                    parts=[types.Part.from_text(context_text)]
                 )
             )
         
-        # Generate response with tool calling
+        # Add recent conversation history
+        messages.extend(self._contents)
+        
+        # Stream response with tool calling
         try:
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=messages,
-                tools=self.tools,
-                config=types.GenerateContentConfig(
-                    temperature=0.8,
-                    top_p=0.95,
-                    max_output_tokens=2048
-                )
+            config = types.GenerateContentConfig(
+                temperature=0.8,
+                top_p=0.95,
+                max_output_tokens=2048,
+                cached_content=cached_content
             )
+            if cached_content:
+                stream = self.client.models.generate_content_stream(
+                    model=self.model,
+                    contents=messages,
+                    config=config
+                )
+            else:
+                stream = self.client.models.generate_content_stream(
+                    model=self.model,
+                    contents=messages,
+                    tools=self.tools,
+                    config=config
+                )
             
-            # Process response
-            response_text = ""
+            # Process response chunks as they arrive
+            text_parts = []
             tool_calls = []
             
-            for candidate in response.candidates:
-                for part in candidate.content.parts:
-                    if hasattr(part, 'text') and part.text:
-                        response_text += part.text
-                    elif hasattr(part, 'function_call'):
-                        tool_calls.append(part.function_call)
+            for chunk in stream:
+                for candidate in chunk.candidates or []:
+                    if not candidate.content or not candidate.content.parts:
+                        continue
+                    for part in candidate.content.parts:
+                        text = getattr(part, 'text', None)
+                        if text:
+                            text_parts.append(text)
+                            yield text
+                        else:
+                            function_call = getattr(part, 'function_call', None)
+                            if function_call is not None:
+                                tool_calls.append(function_call)
+            
+            # Execute tool calls once the stream is complete
+            calls = [(tool_call.name, dict(tool_call.args or {})) for tool_call in tool_calls]
+            
+            if len(calls) > 1:
+                # Independent calls run concurrently; results keep call order
+                futures = [
+                    self._tool_pool.submit(self._execute_tool, tool_name, tool_args)
+                    for tool_name, tool_args in calls
+                ]
+                results = [future.result() for future in futures]
+            else:
+                results = [self._execute_tool(tool_name, tool_args) for tool_name, tool_args in calls]
             
-            # Execute tool calls
             tool_results = []
-            for tool_call in tool_calls:
-                tool_name = tool_call.name
-                tool_args = {}
-                for arg_name, arg_value in tool_call.args.items():
-                    tool_args[arg_name] = arg_value
-                
-                result = self._execute_tool(tool_name, tool_args)
+            for (tool_name, _), result in zip(calls, results):
                 tool_results.append({
                     "tool": tool_name,
                     "result": result
@@ -417,13 +508,20 @@ Active Quests: {len(current_state.get('active_quests', []))}
                 
                 # Update response text with tool result
                 if result.get("success"):
-                    response_text += f"\n\n[Used {tool_name}: {result.get('message', 'Success')}]"
+                    tool_text = f"\n\n[Used {tool_name}: {result.get('message', 'Success')}]"
+                    text_parts.append(tool_text)
+                    yield tool_text
+            
+            response_text = "".join(text_parts)
             
             # Add response to history
             self.conversation_history.append({
                 "role": "assistant",
                 "content": response_text
             })
+            self._contents.append(
+                types.Content(role="model", parts=[types.Part.from_text(response_text)])
+            )
             
             # Update state history
             if current_state:
@@ -444,6 +542,26 @@ Active Quests: {len(current_state.get('active_quests', []))}
                 "success": False
             }
     
+    def process_message(self, user_message: str) -> Dict[str, Any]:
+        """
+        Process a user message and generate a response.
+        
+        Drains process_message_stream; use that directly to show text
+        to the player as it is generated.
+        
+        Args:
+            user_message: User's message/action
+        
+        Returns:
+            Agent response dictionary
+        """
+        stream = self.process_message_stream(user_message)
+        while True:
+            try:
+                next(stream)
+            except StopIteration as done:
+                return done.value
+    
     def get_state(self) -> Optional[Dict[str, Any]]:
         """Get the current game state."""
         return self.state_manager.get_current_state()
@@ -457,6 +575,17 @@ Active Quests: {len(current_state.get('active_quests', []))}
         result = self.state_manager.load_state(filename)
         if result.get("success"):
             # Reset conversation history
-            self.conversation_history = []
+            self.conversation_history.clear()
+            self._contents.clear()
         return result
-
+    
+    def close(self) -> None:
+        """Shut down the tool worker pool and release the context cache."""
+        self._tool_pool.shutdown(wait=True)
+        self._drop_cache()
+    
+    def __enter__(self) -> "GameMasterAgent":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
@@ -4,8 +4,71 @@ Handles character creation, stats, and progression.
 """
 
 import json
-from typing import Dict, Any, Optional
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
+from typing import Dict, Any, FrozenSet, Optional, Tuple
+from src.tools import ability_modifier
+
+
+@dataclass(frozen=True)
+class ClassTemplate:
+    """Per-class data needed to build and level a character."""
+    __slots__ = ("hit_die", "primary_stats", "starting_skills", "starting_equipment", "hp_gain_base")
+    
+    hit_die: int
+    primary_stats: FrozenSet[str]
+    starting_skills: Tuple[str, ...]
+    starting_equipment: Tuple[str, ...]
+    hp_gain_base: int  # average hit die roll gained per level
+
+
+def _make_template(hit_die: int, primary_stats: FrozenSet[str] = frozenset(),
+                   starting_skills: Tuple[str, ...] = (),
+                   starting_equipment: Tuple[str, ...] = ()) -> ClassTemplate:
+    """Build a ClassTemplate, deriving the per-level HP gain from the hit die."""
+    return ClassTemplate(hit_die, primary_stats, starting_skills, starting_equipment,
+                         hp_gain_base=(hit_die // 2) + 1)
+
+
+_DEFAULT_TEMPLATE = _make_template(8)
+
+# Minimum experience for each level, starting at level 1
+_XP_THRESHOLDS = (0, 300, 900, 2700, 6500, 14000, 23000, 34000, 48000, 64000)
+
+
+_CLASS_TEMPLATES_PATH = "data/templates/character_classes.json"
+
+
+@lru_cache(maxsize=4)
+def _parse_class_templates(path: str, mtime: float) -> Dict[str, ClassTemplate]:
+    """
+    Parse a character classes file, cached per path and modification time.
+    
+    The result is shared between callers; treat it as read-only.
+    """
+    with open(path, 'r') as f:
+        classes = json.load(f)
+    
+    return {
+        class_id: _make_template(
+            hit_die=info.get("hit_die", 8),
+            primary_stats=frozenset(info.get("primary_stats", [])),
+            starting_skills=tuple(info.get("starting_skills", [])),
+            starting_equipment=tuple(info.get("starting_equipment", []))
+        )
+        for class_id, info in classes.items()
+    }
+
+
+def _load_class_templates() -> Dict[str, ClassTemplate]:
+    """Get the character class templates, or {} if the file does not exist."""
+    try:
+        mtime = Path(_CLASS_TEMPLATES_PATH).stat().st_mtime
+    except FileNotFoundError:
+        return {}
+    return _parse_class_templates(_CLASS_TEMPLATES_PATH, mtime)
 
 
 def create_character(name: str, race: str, character_class: str, 
@@ -22,16 +85,7 @@ def create_character(name: str, race: str, character_class: str,
     Returns:
         Complete character dictionary
     """
-    # Load class templates
-    templates_path = Path("data/templates/character_classes.json")
-    if templates_path.exists():
-        with open(templates_path, 'r') as f:
-            classes = json.load(f)
-    else:
-        classes = {}
-    
-    class_info = classes.get(character_class.lower(), {})
-    hit_die = class_info.get("hit_die", 8)
+    template = _load_class_templates().get(character_class.lower(), _DEFAULT_TEMPLATE)
     
     # Default stats (point buy system - 27 points)
     if stats is None:
@@ -45,20 +99,16 @@ def create_character(name: str, race: str, character_class: str,
         }
         
         # Adjust based on primary stats
-        primary_stats = class_info.get("primary_stats", [])
-        for stat in primary_stats:
-            if stat in stats:
-                stats[stat] = max(stats[stat], 15)
+        for stat in template.primary_stats & stats.keys():
+            stats[stat] = max(stats[stat], 15)
     
     # Calculate HP
-    con_modifier = (stats["constitution"] - 10) // 2
-    max_hp = hit_die + con_modifier
-    
-    # Get starting skills
-    starting_skills = class_info.get("starting_skills", [])
+    con_modifier = ability_modifier(stats["constitution"])
+    max_hp = template.hit_die + con_modifier
     
-    # Get starting equipment
-    starting_equipment = class_info.get("starting_equipment", [])
+    starting_equipment = template.starting_equipment
+    weapon = starting_equipment[0] if starting_equipment else "unarmed"
+    armor = starting_equipment[1] if len(starting_equipment) > 1 else "none"
     
     character = {
         "name": name,
@@ -70,16 +120,16 @@ def create_character(name: str, race: str, character_class: str,
             "current": max_hp,
             "max": max_hp
         },
-        "ac": 10 + (stats["dexterity"] - 10) // 2,  # Base AC
+        "ac": 10 + ability_modifier(stats["dexterity"]),  # Base AC
         "stats": stats,
         "skills": {
-            "proficient": starting_skills,
+            "proficient": list(template.starting_skills),
             "expertise": []
         },
-        "inventory": starting_equipment.copy(),
+        "inventory": list(starting_equipment),
         "equipped": {
-            "weapon": starting_equipment[0] if starting_equipment else "unarmed",
-            "armor": starting_equipment[1] if len(starting_equipment) > 1 else "none"
+            "weapon": weapon,
+            "armor": armor
         },
         "gold": 50,
         "background": f"A {race} {character_class} seeking adventure"
@@ -90,28 +140,22 @@ def create_character(name: str, race: str, character_class: str,
 
 def level_up_character(character: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Level up a character, increasing HP and potentially stats.
+    Level up a character in place, increasing HP and potentially stats.
     
     Args:
-        character: Character dictionary
+        character: Character dictionary (mutated)
     
     Returns:
-        Updated character dictionary
+        The same character dictionary
     """
-    character = character.copy()
-    old_level = character["level"]
-    new_level = old_level + 1
+    new_level = character["level"] + 1
     
     # Calculate new HP
-    class_info = character.get("class", "fighter")
-    hit_die = 8  # Default
-    if Path("data/templates/character_classes.json").exists():
-        with open("data/templates/character_classes.json", 'r') as f:
-            classes = json.load(f)
-            hit_die = classes.get(class_info.lower(), {}).get("hit_die", 8)
+    class_id = character.get("class", "fighter").lower()
+    template = _load_class_templates().get(class_id, _DEFAULT_TEMPLATE)
     
-    con_modifier = (character["stats"]["constitution"] - 10) // 2
-    hp_gain = max(1, (hit_die // 2) + 1 + con_modifier)  # Average roll
+    con_modifier = ability_modifier(character["stats"]["constitution"])
+    hp_gain = max(1, template.hp_gain_base + con_modifier)
     
     character["level"] = new_level
     character["hp"]["max"] += hp_gain
@@ -121,8 +165,7 @@ def level_up_character(character: Dict[str, Any]) -> Dict[str, Any]:
     if new_level % 4 == 0:
         # Increase highest stat by 1
         stats = character["stats"]
-        max_stat = max(stats.items(), key=lambda x: x[1])
-        stats[max_stat[0]] += 1
+        stats[max(stats, key=stats.__getitem__)] += 1
     
     return character
 
@@ -142,17 +185,13 @@ def add_experience(character: Dict[str, Any], xp: int) -> Dict[str, Any]:
     character["experience"] += xp
     
     # Calculate level based on XP (simplified)
-    xp_thresholds = [0, 300, 900, 2700, 6500, 14000, 23000, 34000, 48000, 64000]
-    new_level = 1
-    for i, threshold in enumerate(xp_thresholds):
-        if character["experience"] >= threshold:
-            new_level = i + 1
+    new_level = max(1, bisect_right(_XP_THRESHOLDS, character["experience"]))
     
     leveled_up = new_level > character["level"]
     
     if leveled_up:
-        while character["level"] < new_level:
-            character = level_up_character(character)
+        for _ in range(new_level - character["level"]):
+            level_up_character(character)
     
     return {
         "character": character,
@@ -174,7 +213,7 @@ def get_character_summary(character: Dict[str, Any]) -> str:
     stats = character.get("stats", {})
     hp = character.get("hp", {})
     
-    summary = f"""
+    return f"""
 === {character.get('name', 'Unknown')} ===
 Race: {character.get('race', 'Unknown')}
 Class: {character.get('class', 'Unknown')}
@@ -192,5 +231,4 @@ Gold: {character.get('gold', 0)}
 
 Equipment: {', '.join(character.get('inventory', []))}
 """
-    return summary
 
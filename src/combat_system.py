@@ -4,8 +4,10 @@ Handles combat encounters, initiative, and turn-based combat with conditions.
 """
 
 import random
-from typing import Dict, Any, List, Optional
-from src.tools import roll_dice, perform_attack, update_character_stat
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping, Optional, Tuple
+from src.tools import ability_modifier, perform_attack, update_character_stat
 
 
 # Combat conditions
@@ -48,6 +50,82 @@ COMBAT_CONDITIONS = {
 }
 
 
+@dataclass(frozen=True)
+class ConditionDef:
+    """Per-turn effects of a combat condition (absent effects are zero in _CONDITION_LIST)."""
+    __slots__ = ("name", "description", "duration", "damage_per_turn",
+                 "attack_bonus", "attack_penalty", "ac_modifier")
+    
+    name: str
+    description: str
+    duration: int
+    damage_per_turn: int
+    attack_bonus: int
+    attack_penalty: int
+    ac_modifier: int
+
+
+# COMBAT_CONDITIONS flattened for the per-turn hot paths; applied
+# conditions carry their index into _CONDITION_LIST as "cid"
+_CONDITION_LIST: Tuple[ConditionDef, ...] = tuple(
+    ConditionDef(
+        name=info["name"],
+        description=info["description"],
+        duration=info.get("duration", 1),
+        damage_per_turn=info.get("damage_per_turn", 0),
+        attack_bonus=info.get("attack_bonus", 0),
+        attack_penalty=info.get("attack_penalty", 0),
+        ac_modifier=-2 if "ac" in info.get("affects", ()) else 0  # Stunned reduces AC
+    )
+    for info in COMBAT_CONDITIONS.values()
+)
+_COND_NAME_TO_ID: Dict[str, int] = {
+    condition_id: cid for cid, condition_id in enumerate(COMBAT_CONDITIONS)
+}
+
+# Shared read-only results for combatants without conditions
+_EMPTY_EFFECTS = MappingProxyType({"effects": (), "damage_taken": 0, "conditions_removed": ()})
+_EMPTY_MODIFIERS = MappingProxyType({"attack_bonus": 0, "attack_penalty": 0, "ac_modifier": 0})
+
+# Faces of a d20, for batched initiative rolls
+_D20_FACES = range(1, 21)
+
+# Level multiplier per difficulty setting
+_DIFFICULTY_MULT = MappingProxyType({
+    "easy": 0.8,
+    "medium": 1.0,
+    "hard": 1.3
+})
+
+# Enemy templates; stats are (name, value) pairs so each enemy gets its own dict
+_ENEMY_TEMPLATES = MappingProxyType({
+    "goblin": MappingProxyType({
+        "stats": (("strength", 8), ("dexterity", 14), ("constitution", 10),
+                  ("intelligence", 10), ("wisdom", 8), ("charisma", 8)),
+        "hp_die": 7,
+        "ac": 15
+    }),
+    "skeleton": MappingProxyType({
+        "stats": (("strength", 10), ("dexterity", 14), ("constitution", 15),
+                  ("intelligence", 6), ("wisdom", 8), ("charisma", 5)),
+        "hp_die": 9,
+        "ac": 13
+    }),
+    "orc": MappingProxyType({
+        "stats": (("strength", 16), ("dexterity", 12), ("constitution", 16),
+                  ("intelligence", 7), ("wisdom", 11), ("charisma", 10)),
+        "hp_die": 15,
+        "ac": 13
+    }),
+    "animated_furniture": MappingProxyType({
+        "stats": (("strength", 14), ("dexterity", 8), ("constitution", 16),
+                  ("intelligence", 1), ("wisdom", 3), ("charisma", 1)),
+        "hp_die": 10,
+        "ac": 12
+    })
+})
+
+
 class CombatManager:
     """Manages combat encounters."""
     
@@ -58,6 +136,12 @@ class CombatManager:
         self.combatants = []
         self.combat_active = False
         self.conditions: Dict[str, List[Dict[str, Any]]] = {}  # character_name -> list of conditions
+        # Defeated combatants stay in combatants/initiative_order; _alive flags them per initiative slot
+        self._alive = bytearray()
+        self._by_name: Dict[str, int] = {}  # enemy name -> initiative slot of the first live enemy
+        self._slots: List[int] = []  # initiative slot per combatants index
+        self._alive_players = 0
+        self._alive_enemies = 0
     
     def apply_condition(self, character_name: str, condition_name: str, 
                        duration: Optional[int] = None) -> Dict[str, Any]:
@@ -72,80 +156,88 @@ class CombatManager:
         Returns:
             Result dictionary
         """
-        if condition_name not in COMBAT_CONDITIONS:
+        cid = _COND_NAME_TO_ID.get(condition_name)
+        if cid is None:
             return {"success": False, "error": f"Unknown condition: {condition_name}"}
         
-        condition_template = COMBAT_CONDITIONS[condition_name]
+        condition_template = _CONDITION_LIST[cid]
         condition = {
             "name": condition_name,
-            "description": condition_template["description"],
-            "duration": duration or condition_template.get("duration", 1),
+            "cid": cid,
+            "description": condition_template.description,
+            "duration": duration or condition_template.duration,
             "applied_at_round": self.round
         }
         
-        if character_name not in self.conditions:
-            self.conditions[character_name] = []
+        character_conditions = self.conditions.setdefault(character_name, [])
         
         # Check if already has this condition
-        existing = [c for c in self.conditions[character_name] if c["name"] == condition_name]
+        existing = [c for c in character_conditions if c["name"] == condition_name]
         if existing:
             # Refresh duration
             existing[0]["duration"] = condition["duration"]
             return {"success": True, "refreshed": True, "condition": existing[0]}
         
-        self.conditions[character_name].append(condition)
+        character_conditions.append(condition)
         return {"success": True, "condition": condition}
     
     def remove_condition(self, character_name: str, condition_name: str) -> Dict[str, Any]:
         """Remove a condition from a character."""
-        if character_name in self.conditions:
-            self.conditions[character_name] = [
-                c for c in self.conditions[character_name] if c["name"] != condition_name
-            ]
-            return {"success": True}
-        return {"success": False, "error": "Character not found"}
+        character_conditions = self.conditions.get(character_name)
+        if character_conditions is None:
+            return {"success": False, "error": "Character not found"}
+        
+        self.conditions[character_name] = [
+            c for c in character_conditions if c["name"] != condition_name
+        ]
+        return {"success": True}
     
-    def process_conditions(self, character_name: str, character: Dict[str, Any]) -> Dict[str, Any]:
+    def process_conditions(self, character_name: str, character: Dict[str, Any]) -> Mapping[str, Any]:
         """
         Process conditions for a character at the start/end of their turn.
         
         Returns:
-            Dictionary with condition effects
+            Dictionary with condition effects (shared and read-only when the
+            character has no conditions)
         """
-        if character_name not in self.conditions:
-            return {"effects": [], "damage_taken": 0}
+        character_conditions = self.conditions.get(character_name)
+        if not character_conditions:
+            return _EMPTY_EFFECTS
         
         effects = []
         total_damage = 0
         
         # Process each condition
         conditions_to_remove = []
-        for condition in self.conditions[character_name]:
-            condition_template = COMBAT_CONDITIONS[condition["name"]]
+        kept = []
+        for condition in character_conditions:
+            damage = _CONDITION_LIST[condition["cid"]].damage_per_turn
             
             # Reduce duration
             condition["duration"] -= 1
             
             # Apply effects
-            if "damage_per_turn" in condition_template:
-                damage = condition_template["damage_per_turn"]
-                total_damage += damage
+            total_damage += damage
+            if damage:
                 effects.append(f"{condition['name']}: {damage} damage")
             
             # Check if expired
             if condition["duration"] <= 0:
                 conditions_to_remove.append(condition["name"])
+            else:
+                kept.append(condition)
         
-        # Remove expired conditions
-        for cond_name in conditions_to_remove:
-            self.remove_condition(character_name, cond_name)
-            effects.append(f"{cond_name} expired")
+        # Remove expired conditions in a single pass
+        self.conditions[character_name] = kept
+        effects.extend(f"{cond_name} expired" for cond_name in conditions_to_remove)
         
         # Apply damage
         if total_damage > 0:
             current_hp = character.get("hp", {}).get("current", 0)
             new_hp = max(0, current_hp - total_damage)
             character["hp"]["current"] = new_hp
+            if current_hp > 0 and new_hp == 0:
+                self._record_defeat(character)
         
         return {
             "effects": effects,
@@ -153,22 +245,18 @@ class CombatManager:
             "conditions_removed": conditions_to_remove
         }
     
-    def get_condition_modifiers(self, character_name: str) -> Dict[str, Any]:
-        """Get attack/AC modifiers from conditions."""
-        modifiers = {"attack_bonus": 0, "attack_penalty": 0, "ac_modifier": 0}
+    def get_condition_modifiers(self, character_name: str) -> Mapping[str, Any]:
+        """Get attack/AC modifiers from conditions (shared and read-only when there are none)."""
+        character_conditions = self.conditions.get(character_name)
+        if not character_conditions:
+            return _EMPTY_MODIFIERS
         
-        if character_name not in self.conditions:
-            return modifiers
-        
-        for condition in self.conditions[character_name]:
-            condition_template = COMBAT_CONDITIONS[condition["name"]]
-            
-            if "attack_bonus" in condition_template:
-                modifiers["attack_bonus"] += condition_template["attack_bonus"]
-            if "attack_penalty" in condition_template:
-                modifiers["attack_penalty"] += condition_template["attack_penalty"]
-            if "affects" in condition_template and "ac" in condition_template["affects"]:
-                modifiers["ac_modifier"] -= 2  # Stunned reduces AC
+        modifiers = {"attack_bonus": 0, "attack_penalty": 0, "ac_modifier": 0}
+        for condition in character_conditions:
+            condition_template = _CONDITION_LIST[condition["cid"]]
+            modifiers["attack_bonus"] += condition_template.attack_bonus
+            modifiers["attack_penalty"] += condition_template.attack_penalty
+            modifiers["ac_modifier"] += condition_template.ac_modifier
         
         return modifiers
     
@@ -187,26 +275,23 @@ class CombatManager:
         """
         # Scale enemies based on player level and difficulty
         player_level = player.get("level", 1)
-        difficulty_multipliers = {
-            "easy": 0.8,
-            "medium": 1.0,
-            "hard": 1.3
-        }
-        multiplier = difficulty_multipliers.get(difficulty, 1.0)
+        multiplier = _DIFFICULTY_MULT.get(difficulty, 1.0)
         
         # Adjust enemy levels
+        scaled_level = max(1, int(player_level * multiplier))
         for enemy in enemies:
             base_level = enemy.get("level", 1)
-            scaled_level = max(1, int(player_level * multiplier))
             enemy["level"] = scaled_level
             
             # Recalculate stats for scaled level
             stats = enemy.get("stats", {})
-            for stat in stats:
-                stats[stat] += (scaled_level - base_level) // 2
+            stat_bonus = (scaled_level - base_level) // 2
+            if stat_bonus:
+                for stat in stats:
+                    stats[stat] += stat_bonus
             
             # Recalculate HP
-            con_mod = (stats.get("constitution", 10) - 10) // 2
+            con_mod = ability_modifier(stats.get("constitution", 10))
             hp_die = enemy.get("hp_die", 8)
             max_hp = hp_die * scaled_level + con_mod
             enemy["hp"] = {"current": max_hp, "max": max_hp}
@@ -217,22 +302,19 @@ class CombatManager:
             {"type": "enemy", "character": enemy} for enemy in enemies
         ]
         
-        # Roll initiative for all combatants
-        initiatives = []
-        for combatant in self.combatants:
-            char = combatant["character"]
-            dex_mod = (char.get("stats", {}).get("dexterity", 10) - 10) // 2
-            init_roll = roll_dice("1d20")
-            init_total = init_roll["total"] + dex_mod
-            initiatives.append({
-                "combatant": combatant,
-                "initiative": init_total,
-                "roll": init_roll
-            })
-        
-        # Sort by initiative (highest first)
-        initiatives.sort(key=lambda x: x["initiative"], reverse=True)
-        self.initiative_order = [item["combatant"] for item in initiatives]
+        # Roll initiative for all combatants in one batch of d20s
+        rolls = random.choices(_D20_FACES, k=len(self.combatants))
+        totals = [
+            roll + ability_modifier(c["character"].get("stats", {}).get("dexterity", 10))
+            for roll, c in zip(rolls, self.combatants)
+        ]
+        
+        # Sort by initiative (highest first); the sort is stable, so ties keep combatant order
+        order = sorted(range(len(totals)), key=totals.__getitem__, reverse=True)
+        self.initiative_order = [self.combatants[i] for i in order]
+        
+        self._slots = sorted(range(len(order)), key=order.__getitem__)
+        self.refresh_hp()
         
         self.current_turn = 0
         self.round = 1
@@ -244,9 +326,9 @@ class CombatManager:
                 {
                     "name": c["character"].get("name", "Unknown"),
                     "type": c["type"],
-                    "initiative": init["initiative"]
+                    "initiative": totals[i]
                 }
-                for c, init in zip(self.initiative_order, initiatives)
+                for c, i in zip(self.initiative_order, order)
             ],
             "round": self.round,
             "current_turn": self.initiative_order[0]["character"].get("name", "Unknown")
@@ -268,12 +350,17 @@ class CombatManager:
         if not self.combat_active:
             return {"error": "No active combat", "success": False}
         
-        self.current_turn += 1
-        
-        # Check if round is over
-        if self.current_turn >= len(self.initiative_order):
-            self.current_turn = 0
-            self.round += 1
+        # Advance past defeated combatants
+        for _ in range(len(self.initiative_order)):
+            self.current_turn += 1
+            
+            # Check if round is over
+            if self.current_turn >= len(self.initiative_order):
+                self.current_turn = 0
+                self.round += 1
+            
+            if self._alive[self.current_turn]:
+                break
         
         current = self.get_current_combatant()
         
@@ -298,14 +385,14 @@ class CombatManager:
             Attack result
         """
         # Find target
-        target = None
-        for combatant in self.combatants:
-            if combatant["type"] == "enemy" and combatant["character"].get("name") == target_name:
-                target = combatant["character"]
-                break
-        
-        if not target:
+        slot = self._by_name.get(target_name)
+        if slot is None:
+            # The target may have been healed since it was marked defeated
+            self.refresh_hp()
+            slot = self._by_name.get(target_name)
+        if slot is None:
             return {"error": f"Target {target_name} not found", "success": False}
+        target = self.initiative_order[slot]["character"]
         
         # Perform attack
         result = perform_attack(player, target, weapon)
@@ -319,9 +406,7 @@ class CombatManager:
             # Check if defeated
             if new_hp == 0:
                 result["target_defeated"] = True
-                # Remove from combat
-                self.combatants = [c for c in self.combatants if c["character"] != target]
-                self.initiative_order = [c for c in self.initiative_order if c["character"] != target]
+                self._mark_defeated(slot)
         
         return result
     
@@ -348,6 +433,7 @@ class CombatManager:
             
             if new_hp == 0:
                 result["player_defeated"] = True
+                self._record_defeat(player)
         
         return result
     
@@ -358,10 +444,7 @@ class CombatManager:
         Returns:
             Combat status
         """
-        players = [c for c in self.combatants if c["type"] == "player"]
-        enemies = [c for c in self.combatants if c["type"] == "enemy"]
-        
-        if not players or all(p["character"].get("hp", {}).get("current", 0) <= 0 for p in players):
+        if self._alive_players <= 0:
             self.combat_active = False
             return {
                 "combat_active": False,
@@ -369,7 +452,7 @@ class CombatManager:
                 "message": "All players defeated"
             }
         
-        if not enemies or all(e["character"].get("hp", {}).get("current", 0) <= 0 for e in enemies):
+        if self._alive_enemies <= 0:
             self.combat_active = False
             return {
                 "combat_active": False,
@@ -379,10 +462,63 @@ class CombatManager:
         
         return {
             "combat_active": True,
-            "players_remaining": len(players),
-            "enemies_remaining": len(enemies)
+            "players_remaining": self._alive_players,
+            "enemies_remaining": self._alive_enemies
         }
     
+    def refresh_hp(self) -> None:
+        """
+        Re-read every combatant's current HP.
+        
+        Call after changing HP outside the manager (healing, update_character_stat),
+        so revived or downed combatants are counted correctly again.
+        """
+        self._alive = bytearray(
+            c["character"].get("hp", {}).get("current", 0) > 0 for c in self.initiative_order
+        )
+        self._alive_players = 0
+        self._alive_enemies = 0
+        self._by_name = {}
+        for slot in self._slots:  # first match in combatants order
+            if not self._alive[slot]:
+                continue
+            combatant = self.initiative_order[slot]
+            if combatant["type"] == "player":
+                self._alive_players += 1
+            else:
+                self._alive_enemies += 1
+                self._by_name.setdefault(combatant["character"].get("name"), slot)
+    
+    def _mark_defeated(self, slot: int) -> None:
+        """Flag the combatant in an initiative slot as defeated."""
+        if not self._alive[slot]:
+            return
+        self._alive[slot] = 0
+        
+        combatant = self.initiative_order[slot]
+        if combatant["type"] == "player":
+            self._alive_players -= 1
+            return
+        self._alive_enemies -= 1
+        
+        # Fall back to the next live enemy sharing the name, if any
+        name = combatant["character"].get("name")
+        if self._by_name.get(name) == slot:
+            del self._by_name[name]
+            for other_slot in self._slots:
+                other = self.initiative_order[other_slot]
+                if (self._alive[other_slot] and other["type"] == "enemy"
+                        and other["character"].get("name") == name):
+                    self._by_name[name] = other_slot
+                    break
+    
+    def _record_defeat(self, character: Dict[str, Any]) -> None:
+        """Flag a combatant as defeated given its character dictionary."""
+        for slot, combatant in enumerate(self.initiative_order):
+            if combatant["character"] is character:
+                self._mark_defeated(slot)
+                return
+    
     def end_combat(self) -> Dict[str, Any]:
         """End combat and reset state."""
         self.combat_active = False
@@ -390,6 +526,11 @@ class CombatManager:
         self.current_turn = 0
         self.round = 1
         self.combatants = []
+        self._alive = bytearray()
+        self._by_name = {}
+        self._slots = []
+        self._alive_players = 0
+        self._alive_enemies = 0
         
         return {"combat_ended": True, "success": True}
 
@@ -408,51 +549,16 @@ def create_enemy(name: str, enemy_type: str, level: int = 1,
     Returns:
         Enemy character dictionary
     """
-    # Enemy templates
-    templates = {
-        "goblin": {
-            "stats": {"strength": 8, "dexterity": 14, "constitution": 10, 
-                     "intelligence": 10, "wisdom": 8, "charisma": 8},
-            "hp_die": 7,
-            "ac": 15
-        },
-        "skeleton": {
-            "stats": {"strength": 10, "dexterity": 14, "constitution": 15,
-                     "intelligence": 6, "wisdom": 8, "charisma": 5},
-            "hp_die": 9,
-            "ac": 13
-        },
-        "orc": {
-            "stats": {"strength": 16, "dexterity": 12, "constitution": 16,
-                     "intelligence": 7, "wisdom": 11, "charisma": 10},
-            "hp_die": 15,
-            "ac": 13
-        },
-        "animated_furniture": {
-            "stats": {"strength": 14, "dexterity": 8, "constitution": 16,
-                     "intelligence": 1, "wisdom": 3, "charisma": 1},
-            "hp_die": 10,
-            "ac": 12
-        }
-    }
-    
-    template = templates.get(enemy_type.lower(), templates["goblin"])
-    stats = template["stats"].copy()
-    
+    template = _ENEMY_TEMPLATES.get(enemy_type.lower(), _ENEMY_TEMPLATES["goblin"])
     # Apply difficulty scaling
-    difficulty_multipliers = {
-        "easy": 0.8,
-        "medium": 1.0,
-        "hard": 1.3
-    }
-    multiplier = difficulty_multipliers.get(difficulty, 1.0)
+    multiplier = _DIFFICULTY_MULT.get(difficulty, 1.0)
     scaled_level = max(1, int(level * multiplier))
     
-    # Scale with level
-    for stat in stats:
-        stats[stat] += (scaled_level - 1) // 2
+    # Scale with level while building the enemy's own stats dict
+    stat_bonus = (scaled_level - 1) // 2
+    stats = {stat: value + stat_bonus for stat, value in template["stats"]}
     
-    con_mod = (stats["constitution"] - 10) // 2
+    con_mod = ability_modifier(stats["constitution"])
     max_hp = int(template["hp_die"] * scaled_level * multiplier) + con_mod
     
     # Store original level and difficulty for reference
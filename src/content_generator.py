@@ -3,60 +3,122 @@ Game Master Agent - Content Generation Module
 Generates NPCs, quests, locations, and other game content.
 """
 
-import json
 import random
-from typing import Dict, Any, Optional, List
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, Iterable, Optional, List
 from pathlib import Path
 
+from src._serde import loads
 
-def generate_npc(context: str, role: str, 
-                 templates_path: str = "data/templates/npc_templates.json") -> Dict[str, Any]:
+
+# Module RNG for generated content; reseed with seed() for reproducible output
+_rng = random.Random()
+
+
+def seed(value: Any = None) -> None:
     """
-    Generate an NPC based on context and role.
+    Seed the content generator's random number generator.
     
     Args:
-        context: Story context for the NPC
+        value: Seed value (None seeds from system entropy)
+    """
+    _rng.seed(value)
+
+
+@lru_cache(maxsize=16)
+def _load_templates(path: str, mtime: float) -> Dict[str, Any]:
+    """
+    Parse a templates file, cached per path and modification time.
+    
+    The result is shared between callers; treat it as read-only.
+    """
+    return loads(Path(path).read_bytes())
+
+
+def _get_templates(templates_path: str) -> Dict[str, Any]:
+    """Get the parsed templates for a path, or {} if the file does not exist."""
+    try:
+        mtime = Path(templates_path).stat().st_mtime
+    except FileNotFoundError:
+        return {}
+    return _load_templates(templates_path, mtime)
+
+
+def preload_templates(paths: Iterable[str] = ("data/templates/npc_templates.json",
+                                              "data/templates/quest_templates.json")) -> None:
+    """
+    Parse template files ahead of time so the first NPC or quest doesn't pay for it.
+    
+    Preloaded templates are shared and must be treated as read-only. Files
+    edited afterwards are re-read on their next use.
+    
+    Args:
+        paths: Template files to load; missing files are skipped
+    """
+    for path in paths:
+        _get_templates(path)
+
+
+# Names and demeanors for NPCs generated without a template
+_NAMES = ("Aldric", "Brenna", "Cedric", "Dara", "Ewan", "Fiona",
+          "Gareth", "Helena", "Ivor", "Jenna", "Kael", "Luna")
+_DEMEANORS = ("kind", "stern", "mysterious", "cheerful")
+
+
+def generate_npcs(count: int, context: str, role: str,
+                  templates_path: str = "data/templates/npc_templates.json") -> Dict[str, Any]:
+    """
+    Generate several NPCs of the same role in one batch.
+    
+    Args:
+        count: Number of NPCs to generate
+        context: Story context for the NPCs
         role: NPC role (e.g., "tavern_owner", "guard", "merchant")
         templates_path: Path to NPC templates file
     
     Returns:
-        Generated NPC dictionary
+        Dictionary with the list of generated NPCs
     """
     try:
         # Load templates
-        templates_file = Path(templates_path)
-        if templates_file.exists():
-            with open(templates_file, 'r') as f:
-                templates = json.load(f)
-        else:
-            templates = {}
+        templates = _get_templates(templates_path)
         
         # Get base template
         base_template = templates.get(role.lower(), {})
         
-        # Generate NPC with variations
-        npc = {
-            "name": base_template.get("name", f"Unknown {role}"),
-            "role": role,
-            "personality": base_template.get("personality", "Neutral"),
-            "description": base_template.get("description", "A mysterious figure"),
-            "motivation": base_template.get("motivation", "Unknown"),
-            "dialogue_style": base_template.get("dialogue_style", "Normal"),
-            "context": context,
-            "met": False,
-            "interactions": []
-        }
+        if base_template:
+            names = [base_template.get("name", f"Unknown {role}")] * count
+            descriptions = [base_template.get("description", "A mysterious figure")] * count
+        else:
+            # Generate from scratch, drawing every random variation up front
+            names = _rng.choices(_NAMES, k=count)
+            role_text = role.replace('_', ' ')
+            descriptions = [
+                f"A {role_text} with a {demeanor} demeanor"
+                for demeanor in _rng.choices(_DEMEANORS, k=count)
+            ]
         
-        # Add random variations
-        if not base_template:
-            # Generate from scratch
-            names = ["Aldric", "Brenna", "Cedric", "Dara", "Ewan", "Fiona", 
-                    "Gareth", "Helena", "Ivor", "Jenna", "Kael", "Luna"]
-            npc["name"] = random.choice(names)
-            npc["description"] = f"A {role.replace('_', ' ')} with a {random.choice(['kind', 'stern', 'mysterious', 'cheerful'])} demeanor"
+        personality = base_template.get("personality", "Neutral")
+        motivation = base_template.get("motivation", "Unknown")
+        dialogue_style = base_template.get("dialogue_style", "Normal")
+        npcs = [
+            {
+                "name": name,
+                "role": role,
+                "personality": personality,
+                "description": description,
+                "motivation": motivation,
+                "dialogue_style": dialogue_style,
+                "context": context,
+                "met": False,
+                "interactions": []
+            }
+            for name, description in zip(names, descriptions)
+        ]
         
         return {
-            "npc": npc,
+            "npcs": npcs,
             "success": True
         }
         
@@ -67,6 +129,43 @@ def generate_npc(context: str, role: str,
         }
 
 
+def generate_npc(context: str, role: str, 
+                 templates_path: str = "data/templates/npc_templates.json") -> Dict[str, Any]:
+    """
+    Generate an NPC based on context and role.
+    
+    Args:
+        context: Story context for the NPC
+        role: NPC role (e.g., "tavern_owner", "guard", "merchant")
+        templates_path: Path to NPC templates file
+    
+    Returns:
+        Generated NPC dictionary
+    """
+    result = generate_npcs(1, context, role, templates_path)
+    if not result["success"]:
+        return result
+    
+    return {
+        "npc": result["npcs"][0],
+        "success": True
+    }
+
+
+# Reward multiplier per quest difficulty
+_QUEST_REWARD_MULT = MappingProxyType({
+    "easy": 0.7,
+    "medium": 1.0,
+    "hard": 1.5
+})
+
+
+@lru_cache(maxsize=256)
+def _default_title(theme: str) -> str:
+    """Display title for a quest theme without a template."""
+    return f"{theme.replace('_', ' ').title()} Quest"
+
+
 def create_quest(difficulty: str, theme: str,
                  templates_path: str = "data/templates/quest_templates.json") -> Dict[str, Any]:
     """
@@ -82,41 +181,52 @@ def create_quest(difficulty: str, theme: str,
     """
     try:
         # Load templates
-        templates_file = Path(templates_path)
-        if templates_file.exists():
-            with open(templates_file, 'r') as f:
-                templates = json.load(f)
-        else:
-            templates = {}
+        templates = _get_templates(templates_path)
         
         # Get base template
-        base_template = templates.get(theme.lower(), {})
+        base_template = templates.get(theme.lower())
+        if base_template:
+            # Shared with the template cache, so copy everything the quest may mutate
+            title = base_template.get("title")
+            if title is None:
+                title = _default_title(theme)
+            description = base_template.get("description")
+            if description is None:
+                description = f"A {difficulty} quest"
+            objectives = base_template.get("objectives")
+            objectives = list(objectives) if objectives else []
+            if "rewards" in base_template:
+                template_rewards = base_template["rewards"]
+                items = template_rewards.get("items")
+                rewards = {**template_rewards, "items": list(items) if items else []}
+            else:
+                rewards = {"experience": 100, "gold": 50, "items": []}
+            locations = base_template.get("locations")
+            locations = list(locations) if locations else []
+        else:
+            # Fresh defaults need no copying
+            title = _default_title(theme)
+            description = f"A {difficulty} quest"
+            objectives = []
+            rewards = {"experience": 100, "gold": 50, "items": []}
+            locations = []
         
         # Create quest
         quest = {
-            "title": base_template.get("title", f"{theme.replace('_', ' ').title()} Quest"),
-            "description": base_template.get("description", f"A {difficulty} quest"),
+            "title": title,
+            "description": description,
             "difficulty": difficulty,
             "status": "active",
-            "objectives": base_template.get("objectives", []).copy(),
+            "objectives": objectives,
             "completed_objectives": [],
-            "rewards": base_template.get("rewards", {
-                "experience": 100,
-                "gold": 50,
-                "items": []
-            }).copy(),
-            "locations": base_template.get("locations", []).copy(),
+            "rewards": rewards,
+            "locations": locations,
             "started_at": None,
             "completed_at": None
         }
         
         # Adjust rewards based on difficulty
-        difficulty_multipliers = {
-            "easy": 0.7,
-            "medium": 1.0,
-            "hard": 1.5
-        }
-        multiplier = difficulty_multipliers.get(difficulty.lower(), 1.0)
+        multiplier = _QUEST_REWARD_MULT.get(difficulty.lower(), 1.0)
         quest["rewards"]["experience"] = int(quest["rewards"]["experience"] * multiplier)
         quest["rewards"]["gold"] = int(quest["rewards"]["gold"] * multiplier)
         
@@ -132,6 +242,35 @@ def create_quest(difficulty: str, theme: str,
         }
 
 
+# Built-in location templates (read-only; features are handed out as fresh lists)
+_LOCATION_TEMPLATES = MappingProxyType({
+    "tavern": {
+        "name": "The Rusty Tankard",
+        "description": "A dimly lit tavern with wooden beams overhead. The air smells of ale and roasted meat. Patrons huddle around tables, speaking in hushed tones.",
+        "features": ("bar", "tables", "fireplace", "stairs"),
+        "atmosphere": "warm but tense"
+    },
+    "dungeon": {
+        "name": "Ancient Dungeon",
+        "description": "Cold stone walls covered in moss. Torches flicker, casting dancing shadows. The sound of dripping water echoes in the distance.",
+        "features": ("corridors", "cells", "traps", "treasure_room"),
+        "atmosphere": "ominous and foreboding"
+    },
+    "forest": {
+        "name": "The Whispering Woods",
+        "description": "Tall trees create a canopy overhead, filtering sunlight. Birds chirp in the distance. The path ahead is barely visible.",
+        "features": ("trees", "path", "clearing", "stream"),
+        "atmosphere": "mysterious and alive"
+    },
+    "town": {
+        "name": "Small Town",
+        "description": "A peaceful town with cobblestone streets. Shops line the main road, and townsfolk go about their daily business.",
+        "features": ("shops", "inn", "temple", "market"),
+        "atmosphere": "busy but friendly"
+    }
+})
+
+
 def generate_location(location_type: str, context: str = "") -> Dict[str, Any]:
     """
     Generate a location description.
@@ -143,45 +282,20 @@ def generate_location(location_type: str, context: str = "") -> Dict[str, Any]:
     Returns:
         Location dictionary
     """
-    location_templates = {
-        "tavern": {
-            "name": "The Rusty Tankard",
-            "description": "A dimly lit tavern with wooden beams overhead. The air smells of ale and roasted meat. Patrons huddle around tables, speaking in hushed tones.",
-            "features": ["bar", "tables", "fireplace", "stairs"],
-            "atmosphere": "warm but tense"
-        },
-        "dungeon": {
-            "name": "Ancient Dungeon",
-            "description": "Cold stone walls covered in moss. Torches flicker, casting dancing shadows. The sound of dripping water echoes in the distance.",
-            "features": ["corridors", "cells", "traps", "treasure_room"],
-            "atmosphere": "ominous and foreboding"
-        },
-        "forest": {
-            "name": "The Whispering Woods",
-            "description": "Tall trees create a canopy overhead, filtering sunlight. Birds chirp in the distance. The path ahead is barely visible.",
-            "features": ["trees", "path", "clearing", "stream"],
-            "atmosphere": "mysterious and alive"
-        },
-        "town": {
-            "name": "Small Town",
-            "description": "A peaceful town with cobblestone streets. Shops line the main road, and townsfolk go about their daily business.",
-            "features": ["shops", "inn", "temple", "market"],
-            "atmosphere": "busy but friendly"
+    template = _LOCATION_TEMPLATES.get(location_type.lower())
+    if template is None:
+        template = {
+            "name": f"{location_type.title()}",
+            "description": f"A {location_type}",
+            "features": (),
+            "atmosphere": "neutral"
         }
-    }
-    
-    template = location_templates.get(location_type.lower(), {
-        "name": f"{location_type.title()}",
-        "description": f"A {location_type}",
-        "features": [],
-        "atmosphere": "neutral"
-    })
     
     location = {
         "type": location_type,
         "name": template["name"],
         "description": template["description"],
-        "features": template["features"],
+        "features": list(template["features"]),
         "atmosphere": template["atmosphere"],
         "context": context,
         "explored": False,
@@ -195,6 +309,17 @@ def generate_location(location_type: str, context: str = "") -> Dict[str, Any]:
     }
 
 
+_ENEMY_TYPES = ("goblin", "skeleton", "orc", "animated_furniture", "bandit")
+_LEVEL_DELTAS = (-1, 0, 1)
+
+# (min, max) enemy count per encounter difficulty
+_ENCOUNTER_SIZES = MappingProxyType({
+    "easy": (1, 2),
+    "medium": (2, 3),
+    "hard": (3, 5)
+})
+
+
 def generate_combat_encounter(difficulty: str, location: str, 
                               player_level: int = 1) -> Dict[str, Any]:
     """
@@ -208,26 +333,20 @@ def generate_combat_encounter(difficulty: str, location: str,
     Returns:
         Encounter dictionary with enemies
     """
-    enemy_types = ["goblin", "skeleton", "orc", "animated_furniture", "bandit"]
-    
-    difficulty_enemy_counts = {
-        "easy": (1, 2),
-        "medium": (2, 3),
-        "hard": (3, 5)
-    }
-    
-    min_count, max_count = difficulty_enemy_counts.get(difficulty.lower(), (1, 2))
-    enemy_count = random.randint(min_count, max_count)
+    min_count, max_count = _ENCOUNTER_SIZES.get(difficulty.lower(), (1, 2))
+    enemy_count = _rng.randint(min_count, max_count)
     
-    enemies = []
-    for i in range(enemy_count):
-        enemy_type = random.choice(enemy_types)
-        enemy_name = f"{enemy_type.title()} {i+1}"
-        enemies.append({
-            "name": enemy_name,
+    # Draw every enemy type and level offset up front
+    enemy_types = _rng.choices(_ENEMY_TYPES, k=enemy_count)
+    level_deltas = _rng.choices(_LEVEL_DELTAS, k=enemy_count)
+    enemies = [
+        {
+            "name": f"{enemy_type.title()} {i+1}",
             "type": enemy_type,
-            "level": max(1, player_level + random.randint(-1, 1))
-        })
+            "level": max(1, player_level + delta)
+        }
+        for i, (enemy_type, delta) in enumerate(zip(enemy_types, level_deltas))
+    ]
     
     encounter = {
         "difficulty": difficulty,
@@ -242,6 +361,33 @@ def generate_combat_encounter(difficulty: str, location: str,
     }
 
 
+# Puzzle entries are read-only; answers are stored lowercase and hints as
+# tuples so generate_puzzle can use them without normalizing
+_RIDDLES = tuple(MappingProxyType(riddle) for riddle in (
+    {
+        "question": "I speak without a mouth and hear without ears. I have no body, but I come alive with wind. What am I?",
+        "answer": "echo",
+        "hints": ("It's a sound phenomenon", "It repeats what you say")
+    },
+    {
+        "question": "The more you take, the more you leave behind. What am I?",
+        "answer": "footsteps",
+        "hints": ("Think about walking", "They're left on the ground")
+    },
+    {
+        "question": "I have cities, but no houses. I have mountains, but no trees. I have water, but no fish. What am I?",
+        "answer": "map",
+        "hints": ("It's something you use for navigation", "It shows geographical features")
+    }
+))
+
+_LOGIC_PUZZLE = MappingProxyType({
+    "question": "Solve this logic puzzle: If all roses are flowers, and some flowers are red, are all roses red?",
+    "answer": "no",
+    "hints": ("Think about the logic", "Not all flowers are roses")
+})
+
+
 def generate_puzzle(puzzle_type: str = "riddle") -> Dict[str, Any]:
     """
     Generate a puzzle or riddle.
@@ -252,39 +398,17 @@ def generate_puzzle(puzzle_type: str = "riddle") -> Dict[str, Any]:
     Returns:
         Puzzle dictionary
     """
-    riddles = [
-        {
-            "question": "I speak without a mouth and hear without ears. I have no body, but I come alive with wind. What am I?",
-            "answer": "echo",
-            "hints": ["It's a sound phenomenon", "It repeats what you say"]
-        },
-        {
-            "question": "The more you take, the more you leave behind. What am I?",
-            "answer": "footsteps",
-            "hints": ["Think about walking", "They're left on the ground"]
-        },
-        {
-            "question": "I have cities, but no houses. I have mountains, but no trees. I have water, but no fish. What am I?",
-            "answer": "map",
-            "hints": ["It's something you use for navigation", "It shows geographical features"]
-        }
-    ]
-    
     if puzzle_type.lower() == "riddle":
-        puzzle = random.choice(riddles)
+        puzzle = _RIDDLES[_rng.randrange(len(_RIDDLES))]
     else:
-        puzzle = {
-            "question": "Solve this logic puzzle: If all roses are flowers, and some flowers are red, are all roses red?",
-            "answer": "no",
-            "hints": ["Think about the logic", "Not all flowers are roses"]
-        }
+        puzzle = _LOGIC_PUZZLE
     
     return {
         "puzzle": {
             "type": puzzle_type,
             "question": puzzle["question"],
-            "answer": puzzle["answer"].lower(),
-            "hints": puzzle.get("hints", []),
+            "answer": puzzle["answer"],
+            "hints": list(puzzle["hints"]),
             "solved": False
         },
         "success": True
@@ -3,21 +3,195 @@ Game Master Agent - Reputation System
 Tracks player reputation with different factions and NPCs.
 """
 
-from typing import Dict, Any, Optional
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from types import MappingProxyType
+from typing import Dict, Any, Deque, Iterator, List, Mapping, Optional, Tuple
+
+
+# Lower bounds of each reputation level above "Hated", ascending
+_THRESHOLDS = (-50, -20, 20, 50, 80)
+_LEVELS = ("Hated", "Hostile", "Unfriendly", "Neutral", "Friendly", "Revered")
+
+# Fields of a reputation history entry, in column order
+_HISTORY_FIELDS = ("type", "target", "change", "new_reputation", "reason")
+
+# NPC reaction modifiers per reputation level
+_REACTIONS = MappingProxyType({
+    "Revered": {
+        "dialogue_modifier": 10,
+        "willingness_to_help": 1.0,
+        "discount": 0.5,  # 50% discount
+        "description": "They trust you completely and will go out of their way to help."
+    },
+    "Friendly": {
+        "dialogue_modifier": 5,
+        "willingness_to_help": 0.8,
+        "discount": 0.2,  # 20% discount
+        "description": "They like you and are generally helpful."
+    },
+    "Neutral": {
+        "dialogue_modifier": 0,
+        "willingness_to_help": 0.5,
+        "discount": 0.0,
+        "description": "They don't know you well, neutral attitude."
+    },
+    "Unfriendly": {
+        "dialogue_modifier": -5,
+        "willingness_to_help": 0.3,
+        "discount": 0.0,
+        "description": "They're wary of you and less helpful."
+    },
+    "Hostile": {
+        "dialogue_modifier": -10,
+        "willingness_to_help": 0.1,
+        "discount": 0.0,
+        "description": "They dislike you and may refuse to help."
+    },
+    "Hated": {
+        "dialogue_modifier": -20,
+        "willingness_to_help": 0.0,
+        "discount": 0.0,
+        "description": "They despise you and may attack on sight."
+    }
+})
 
 
 class ReputationSystem:
-    """Manages player reputation with factions and NPCs."""
+    """
+    Manages player reputation with factions and NPCs.
     
-    def __init__(self):
-        """Initialize the reputation system."""
-        self.faction_reputations: Dict[str, int] = {}  # faction_name -> reputation (-100 to 100)
+    Reputation history is stored column-wise, one bounded deque per field,
+    rather than as a list of dicts; history_view() and reputation_history
+    rebuild the row form on demand. Only the most recent max_history entries
+    are kept.
+    
+    Once the faction list is settled, freeze() moves faction reputations into
+    sorted keys plus an int8 array; they stay there until a new faction is
+    added or faction_reputations is reassigned.
+    """
+    
+    # faction_reputations and reputation_history are properties over these
+    __slots__ = (
+        "max_history", "npc_reputations",
+        "_factions", "_faction_keys", "_faction_values", "_faction_index",
+        "_hist_type", "_hist_target", "_hist_change", "_hist_new", "_hist_reason",
+    )
+    
+    def __init__(self, max_history: int = 10000):
+        """
+        Initialize the reputation system.
+        
+        Args:
+            max_history: Maximum number of reputation history entries to keep
+        """
+        self.max_history = max_history
+        self._factions: Dict[str, int] = {}  # faction_name -> reputation (-100 to 100)
+        self._faction_keys: Optional[Tuple[str, ...]] = None  # sorted, set while frozen
+        self._faction_values = array('b')
+        self._faction_index: Dict[str, int] = {}
         self.npc_reputations: Dict[str, int] = {}  # npc_name -> reputation (-100 to 100)
-        self.reputation_history: list = []
+        self._clear_history()
+    
+    @property
+    def faction_reputations(self) -> Mapping[str, int]:
+        """
+        Faction reputations.
+        
+        While frozen this is a read-only snapshot; use modify_reputation, or
+        unfreeze() first, to change values.
+        """
+        if self._faction_keys is None:
+            return self._factions
+        return MappingProxyType(self._frozen_factions())
+    
+    @faction_reputations.setter
+    def faction_reputations(self, reputations: Dict[str, int]) -> None:
+        self._faction_keys = None
+        self._faction_values = array('b')
+        self._faction_index = {}
+        self._factions = reputations
+    
+    def _frozen_factions(self) -> Dict[str, int]:
+        """Rebuild the faction dictionary from the frozen arrays."""
+        return dict(zip(self._faction_keys or (), self._faction_values))
+    
+    @property
+    def frozen(self) -> bool:
+        """Whether faction reputations are held in the frozen array form."""
+        return self._faction_keys is not None
+    
+    def freeze(self) -> None:
+        """
+        Switch faction reputations to sorted keys plus an int8 array.
+        
+        Intended for after setup, when the faction list no longer changes;
+        modifying an unknown faction unfreezes automatically.
+        """
+        keys = tuple(sorted(self._factions))
+        self._faction_values = array('b', [int(self._factions[key]) for key in keys])
+        self._faction_index = {key: i for i, key in enumerate(keys)}
+        self._faction_keys = keys
+        self._factions = {}
+    
+    def unfreeze(self) -> None:
+        """Move faction reputations back into a plain dictionary."""
+        if self._faction_keys is not None:
+            self.faction_reputations = self._frozen_factions()
+    
+    def _clear_history(self) -> None:
+        """Reset the history columns."""
+        self._hist_type: Deque[str] = deque(maxlen=self.max_history)
+        self._hist_target: Deque[str] = deque(maxlen=self.max_history)
+        self._hist_change: Deque[int] = deque(maxlen=self.max_history)
+        self._hist_new: Deque[int] = deque(maxlen=self.max_history)
+        self._hist_reason: Deque[str] = deque(maxlen=self.max_history)
+    
+    def _history_columns(self) -> tuple:
+        """History columns in _HISTORY_FIELDS order."""
+        return (self._hist_type, self._hist_target, self._hist_change,
+                self._hist_new, self._hist_reason)
+    
+    def _record(self, kind: str, target: str, change: int, new_reputation: int, reason: str) -> None:
+        """Append one entry to the history columns."""
+        self._hist_type.append(kind)
+        self._hist_target.append(target)
+        self._hist_change.append(change)
+        self._hist_new.append(new_reputation)
+        self._hist_reason.append(reason)
+    
+    def history_view(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over reputation history entries as dictionaries, oldest first."""
+        for row in zip(*self._history_columns()):
+            yield dict(zip(_HISTORY_FIELDS, row))
+    
+    @property
+    def reputation_history(self) -> List[Dict[str, Any]]:
+        """
+        Reputation history as a list of dictionaries.
+        
+        The list is rebuilt on each access, so it is a copy: appending to or
+        clearing it does not change the history. Assign a new list instead.
+        """
+        return list(self.history_view())
+    
+    @reputation_history.setter
+    def reputation_history(self, history: List[Dict[str, Any]]) -> None:
+        self._clear_history()
+        for entry in history:
+            self._record(entry["type"], entry["target"], entry["change"],
+                         entry["new_reputation"], entry.get("reason", ""))
     
     def get_faction_reputation(self, faction: str) -> int:
         """Get reputation with a faction."""
-        return self.faction_reputations.get(faction, 0)
+        keys = self._faction_keys
+        if keys is None:
+            return self._factions.get(faction, 0)
+        i = bisect_left(keys, faction)
+        if i < len(keys) and keys[i] == faction:
+            return self._faction_values[i]
+        return 0
     
     def get_npc_reputation(self, npc_name: str) -> int:
         """Get reputation with an NPC."""
@@ -40,63 +214,50 @@ class ReputationSystem:
             Result dictionary
         """
         if faction:
-            current = self.faction_reputations.get(faction, 0)
-            new_reputation = max(-100, min(100, current + amount))
-            self.faction_reputations[faction] = new_reputation
-            
-            self.reputation_history.append({
-                "type": "faction",
-                "target": faction,
-                "change": amount,
-                "new_reputation": new_reputation,
-                "reason": reason
-            })
-            
-            return {
-                "success": True,
-                "faction": faction,
-                "old_reputation": current,
-                "new_reputation": new_reputation,
-                "change": amount
-            }
-        
+            if self._faction_keys is not None:
+                slot = self._faction_index.get(faction)
+                if slot is not None:
+                    return self._modify(self._faction_values, "faction", faction,
+                                        amount, reason, slot)
+                self.unfreeze()
+            return self._modify(self._factions, "faction", faction, amount, reason)
         elif npc_name:
-            current = self.npc_reputations.get(npc_name, 0)
-            new_reputation = max(-100, min(100, current + amount))
-            self.npc_reputations[npc_name] = new_reputation
-            
-            self.reputation_history.append({
-                "type": "npc",
-                "target": npc_name,
-                "change": amount,
-                "new_reputation": new_reputation,
-                "reason": reason
-            })
-            
-            return {
-                "success": True,
-                "npc": npc_name,
-                "old_reputation": current,
-                "new_reputation": new_reputation,
-                "change": amount
-            }
+            return self._modify(self.npc_reputations, "npc", npc_name, amount, reason)
         
         return {"success": False, "error": "Must specify faction or npc_name"}
     
+    def _modify(self, reputations: Any, kind: str, target: str,
+                amount: int, reason: str, slot: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Apply a clamped reputation change to one target and record it.
+        
+        reputations is a name-keyed dict, or the frozen faction array when
+        slot gives the target's index in it.
+        """
+        amount = int(amount)  # tool-call arguments may arrive as floats
+        if slot is None:
+            current = reputations.get(target, 0)
+            key: Any = target
+        else:
+            current = reputations[slot]
+            key = slot
+        total = current + amount
+        new_reputation = -100 if total < -100 else 100 if total > 100 else total
+        reputations[key] = new_reputation
+        
+        self._record(kind, target, amount, new_reputation, reason)
+        
+        return {
+            "success": True,
+            kind: target,
+            "old_reputation": current,
+            "new_reputation": new_reputation,
+            "change": amount
+        }
+    
     def get_reputation_level(self, reputation: int) -> str:
         """Get reputation level description."""
-        if reputation >= 80:
-            return "Revered"
-        elif reputation >= 50:
-            return "Friendly"
-        elif reputation >= 20:
-            return "Neutral"
-        elif reputation >= -20:
-            return "Unfriendly"
-        elif reputation >= -50:
-            return "Hostile"
-        else:
-            return "Hated"
+        return _LEVELS[bisect_right(_THRESHOLDS, reputation)]
     
     def get_npc_reaction(self, npc_name: str) -> Dict[str, Any]:
         """
@@ -108,62 +269,54 @@ class ReputationSystem:
         reputation = self.get_npc_reputation(npc_name)
         level = self.get_reputation_level(reputation)
         
-        reactions = {
-            "Revered": {
-                "dialogue_modifier": 10,
-                "willingness_to_help": 1.0,
-                "discount": 0.5,  # 50% discount
-                "description": "They trust you completely and will go out of their way to help."
-            },
-            "Friendly": {
-                "dialogue_modifier": 5,
-                "willingness_to_help": 0.8,
-                "discount": 0.2,  # 20% discount
-                "description": "They like you and are generally helpful."
-            },
-            "Neutral": {
-                "dialogue_modifier": 0,
-                "willingness_to_help": 0.5,
-                "discount": 0.0,
-                "description": "They don't know you well, neutral attitude."
-            },
-            "Unfriendly": {
-                "dialogue_modifier": -5,
-                "willingness_to_help": 0.3,
-                "discount": 0.0,
-                "description": "They're wary of you and less helpful."
-            },
-            "Hostile": {
-                "dialogue_modifier": -10,
-                "willingness_to_help": 0.1,
-                "discount": 0.0,
-                "description": "They dislike you and may refuse to help."
-            },
-            "Hated": {
-                "dialogue_modifier": -20,
-                "willingness_to_help": 0.0,
-                "discount": 0.0,
-                "description": "They despise you and may attack on sight."
+        return dict(_REACTIONS[level], reputation=reputation, level=level)
+    
+    def to_dict(self, compact: bool = False, snapshot: bool = False) -> Dict[str, Any]:
+        """
+        Convert reputation system to dictionary.
+        
+        Args:
+            compact: Emit reputation history as a dict of columns instead of
+                a list of entry dicts
+            snapshot: Copy the reputation dicts. By default they are returned
+                by reference (fine for immediate serialization); callers that
+                keep or mutate the result should pass True.
+        """
+        if compact:
+            history: Any = {
+                field: list(column)
+                for field, column in zip(_HISTORY_FIELDS, self._history_columns())
             }
-        }
+        else:
+            history = self.reputation_history
         
-        reaction = reactions.get(level, reactions["Neutral"])
-        reaction["reputation"] = reputation
-        reaction["level"] = level
+        factions = self._factions if self._faction_keys is None else self._frozen_factions()
+        npcs = self.npc_reputations
+        if snapshot:
+            factions = factions.copy()
+            npcs = npcs.copy()
         
-        return reaction
-    
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert reputation system to dictionary."""
         return {
-            "faction_reputations": self.faction_reputations.copy(),
-            "npc_reputations": self.npc_reputations.copy(),
-            "reputation_history": self.reputation_history.copy()
+            "faction_reputations": factions,
+            "npc_reputations": npcs,
+            "reputation_history": history
         }
     
     def from_dict(self, data: Dict[str, Any]):
-        """Load reputation system from dictionary."""
-        self.faction_reputations = data.get("faction_reputations", {})
-        self.npc_reputations = data.get("npc_reputations", {})
-        self.reputation_history = data.get("reputation_history", [])
+        """
+        Load reputation system from dictionary (either history format).
+        
+        The reputation dicts are copied, so data (e.g. another system's
+        to_dict()) is not shared with this system.
+        """
+        self.faction_reputations = dict(data.get("faction_reputations", {}))
+        self.npc_reputations = dict(data.get("npc_reputations", {}))
+        
+        history = data.get("reputation_history", [])
+        if isinstance(history, dict):
+            self._clear_history()
+            for field, column in zip(_HISTORY_FIELDS, self._history_columns()):
+                column.extend(history.get(field, ()))
+        else:
+            self.reputation_history = history
 
@@ -3,10 +3,12 @@ Game Master Agent - Starting Scenarios
 Provides multiple starting scenarios for players to choose from.
 """
 
-from typing import Dict, Any
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping, Tuple
 
 
-SCENARIOS = {
+# Scenario definitions; each one is wrapped read-only below so it can be shared
+SCENARIOS: Dict[str, Mapping[str, Any]] = {
     "the_cursed_tavern": {
         "id": "the_cursed_tavern",
         "name": "The Cursed Tavern",
@@ -16,7 +18,7 @@ SCENARIOS = {
         "initial_prompt": """You are the Game Master for a D&D campaign. The player's character has just arrived at a small town called Millbrook. As they walk through the streets in the evening, they notice something unusual - the local tavern, "The Rusty Tankard", appears to be closed and boarded up, despite it being evening when taverns are usually busy. Strange sounds can be heard from inside - creaking, scraping, and what sounds like furniture moving on its own.
 
 Begin the adventure by describing the scene vividly and inviting the player to investigate. Use rich sensory details and create an atmosphere of mystery and tension.""",
-        "themes": ["mystery", "horror", "urban"],
+        "themes": ("mystery", "horror", "urban"),
         "recommended_level": 1
     },
     "the_lost_treasure": {
@@ -28,7 +30,7 @@ Begin the adventure by describing the scene vividly and inviting the player to i
         "initial_prompt": """You are the Game Master for a D&D campaign. The player's character has just received a mysterious map from a dying adventurer in the local tavern. The map shows the location of a legendary treasure hidden deep in an ancient dungeon. However, the path is marked with warnings of deadly traps, guardians, and ancient magic.
 
 The map is old and partially faded, but clearly shows a route through a forest, across a ravine, and into a mountain cave. Begin by describing how the character receives the map and the sense of adventure and danger that awaits.""",
-        "themes": ["adventure", "exploration", "treasure"],
+        "themes": ("adventure", "exploration", "treasure"),
         "recommended_level": 2
     },
     "the_bandit_menace": {
@@ -40,13 +42,43 @@ The map is old and partially faded, but clearly shows a route through a forest,
         "initial_prompt": """You are the Game Master for a D&D campaign. The player's character has been summoned to the local lord's manor. The lord, a stern but fair ruler, explains that bandits have been attacking merchant caravans on the trade routes, causing economic damage and fear among the populace. He offers a substantial reward for anyone who can eliminate the bandit threat.
 
 The bandits are said to be holed up in an old fort about a day's travel from town. Begin by describing the meeting with the lord and the mission briefing. Create a sense of urgency and the opportunity for heroism.""",
-        "themes": ["combat", "justice", "reward"],
+        "themes": ("combat", "justice", "reward"),
         "recommended_level": 1
     }
 }
+SCENARIOS = {scenario_id: MappingProxyType(scenario) for scenario_id, scenario in SCENARIOS.items()}
 
 
-def get_scenario(scenario_id: str) -> Dict[str, Any]:
+def _index_by_difficulty() -> Dict[str, Tuple[Mapping[str, Any], ...]]:
+    """Group read-only scenario summaries by difficulty."""
+    by_difficulty: Dict[str, List[Mapping[str, Any]]] = {}
+    for scenario_id, scenario in SCENARIOS.items():
+        by_difficulty.setdefault(scenario["difficulty"], []).append(MappingProxyType({
+            "id": scenario_id,
+            "name": scenario["name"],
+            "description": scenario["description"],
+            "difficulty": scenario["difficulty"]
+        }))
+    return {difficulty: tuple(summaries) for difficulty, summaries in by_difficulty.items()}
+
+
+_BY_DIFFICULTY = _index_by_difficulty()
+
+# Read-only summaries of every scenario, in definition order
+_SUMMARIES: Tuple[Mapping[str, Any], ...] = tuple(
+    MappingProxyType({
+        "id": scenario_id,
+        "name": scenario["name"],
+        "description": scenario["description"],
+        "difficulty": scenario["difficulty"],
+        "themes": scenario["themes"],
+        "recommended_level": scenario["recommended_level"]
+    })
+    for scenario_id, scenario in SCENARIOS.items()
+)
+
+
+def get_scenario(scenario_id: str) -> Mapping[str, Any]:
     """
     Get a starting scenario by ID.
     
@@ -54,7 +86,7 @@ def get_scenario(scenario_id: str) -> Dict[str, Any]:
         scenario_id: Scenario identifier
     
     Returns:
-        Scenario dictionary
+        Read-only scenario mapping (use dict() for a mutable copy)
     """
     return SCENARIOS.get(scenario_id, SCENARIOS["the_cursed_tavern"])
 
@@ -63,19 +95,13 @@ def list_scenarios() -> Dict[str, Any]:
     """
     List all available starting scenarios.
     
+    The result is fresh per call; the scenario summaries in it are shared
+    read-only mappings.
+    
     Returns:
         Dictionary with scenario list
     """
-    scenarios_list = []
-    for scenario_id, scenario in SCENARIOS.items():
-        scenarios_list.append({
-            "id": scenario_id,
-            "name": scenario["name"],
-            "description": scenario["description"],
-            "difficulty": scenario["difficulty"],
-            "themes": scenario["themes"],
-            "recommended_level": scenario["recommended_level"]
-        })
+    scenarios_list = list(_SUMMARIES)
     
     return {
         "scenarios": scenarios_list,
@@ -88,22 +114,15 @@ def get_scenario_by_difficulty(difficulty: str) -> Dict[str, Any]:
     """
     Get scenarios filtered by difficulty.
     
+    The list is fresh per call; the scenario summaries in it are shared read-only mappings.
+    
     Args:
         difficulty: Difficulty level ("easy", "medium", "hard")
     
     Returns:
         Dictionary with filtered scenarios
     """
-    filtered = [
-        {
-            "id": scenario_id,
-            "name": scenario["name"],
-            "description": scenario["description"],
-            "difficulty": scenario["difficulty"]
-        }
-        for scenario_id, scenario in SCENARIOS.items()
-        if scenario["difficulty"] == difficulty
-    ]
+    filtered = list(_BY_DIFFICULTY.get(difficulty, ()))
     
     return {
         "scenarios": filtered,
@@ -3,11 +3,51 @@ Game Master Agent - State Management Module
 Handles game state persistence, loading, and saving.
 """
 
-import json
-from typing import Dict, Any, Optional
+import os
+import time
+from collections import deque
+from typing import Dict, Any, Optional, Tuple
 from pathlib import Path
 from datetime import datetime
 
+from src._serde import dumpb, loads, write_atomic
+
+
+# Number of session history entries kept; older entries are dropped
+SESSION_HISTORY_MAX_ENTRIES = 500
+
+# How long a formatted timestamp is reused, in seconds
+_TIMESTAMP_TTL = 0.5
+
+# Suffix of the small metadata file written next to each save for list_saves
+META_SUFFIX = ".meta.json"
+
+
+def _save_metadata(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract the fields list_saves reports from a full game state."""
+    character = state.get("character", {})
+    return {
+        "character": character.get("name", "Unknown"),
+        "last_updated": state.get("last_updated", "Unknown"),
+        "location": state.get("current_location", "Unknown"),
+        "save_slot": state.get("save_slot", None),
+        "level": character.get("level", 1),
+        "playtime": state.get("playtime_minutes", 0)
+    }
+
+
+def _deep_update(base: Dict[str, Any], updates: Dict[str, Any]) -> None:
+    """Merge updates into base in place, recursing into dicts present on both sides."""
+    stack = [(base, updates)]
+    while stack:
+        target, changes = stack.pop()
+        for key, value in changes.items():
+            existing = target.get(key)
+            if isinstance(value, dict) and isinstance(existing, dict):
+                stack.append((existing, value))
+            else:
+                target[key] = value
+
 
 class GameStateManager:
     """Manages game state persistence and loading."""
@@ -22,6 +62,19 @@ class GameStateManager:
         self.save_directory = Path(save_directory)
         self.save_directory.mkdir(parents=True, exist_ok=True)
         self.current_state: Optional[Dict[str, Any]] = None
+        
+        # (monotonic time, ISO timestamp) of the last formatted timestamp
+        self._now_cache: Tuple[float, str] = (float("-inf"), "")
+        
+        # list_saves metadata per save filename, with the save's mtime when read
+        self._save_cache: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+    
+    def _now_iso(self) -> str:
+        """Current time as an ISO string, reformatted at most every _TIMESTAMP_TTL seconds."""
+        now = time.monotonic()
+        if now - self._now_cache[0] > _TIMESTAMP_TTL:
+            self._now_cache = (now, datetime.now().isoformat())
+        return self._now_cache[1]
     
     def create_initial_state(self, character: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -42,26 +95,28 @@ class GameStateManager:
             "npcs_met": {},
             "world_state": {},
             "combat_active": False,
-            "session_history": [],
+            "session_history": deque(maxlen=SESSION_HISTORY_MAX_ENTRIES),
             "reputation": {},
             "achievements": {"achievements": [], "milestones": {}},
             "save_slot": None,
             "playtime_minutes": 0,
-            "created_at": datetime.now().isoformat(),
-            "last_updated": datetime.now().isoformat()
+            "created_at": self._now_iso(),
+            "last_updated": self._now_iso()
         }
         
         self.current_state = state
         return state
     
     def save_state(self, state: Optional[Dict[str, Any]] = None, 
-                   filename: Optional[str] = None) -> Dict[str, Any]:
+                   filename: Optional[str] = None,
+                   pretty: bool = False) -> Dict[str, Any]:
         """
         Save game state to a JSON file.
         
         Args:
             state: Game state dictionary (uses current_state if None)
             filename: Filename to save to (auto-generates if None)
+            pretty: Write indented JSON for debugging (compact by default)
         
         Returns:
             Dictionary with save status
@@ -76,7 +131,7 @@ class GameStateManager:
                 }
             
             # Update timestamp
-            state_to_save["last_updated"] = datetime.now().isoformat()
+            state_to_save["last_updated"] = self._now_iso()
             
             # Generate filename if not provided
             if filename is None:
@@ -90,9 +145,11 @@ class GameStateManager:
             
             filepath = self.save_directory / filename
             
-            # Save to file
-            with open(filepath, 'w') as f:
-                json.dump(state_to_save, f, indent=2)
+            # Save to file (atomically, so a crash never leaves a partial save)
+            write_atomic(filepath, dumpb(state_to_save, indent=pretty))
+            
+            # Written after the save itself, so it is never older than it
+            write_atomic(filepath.with_suffix(META_SUFFIX), dumpb(_save_metadata(state_to_save)))
             
             self.current_state = state_to_save
             
@@ -134,8 +191,7 @@ class GameStateManager:
                     "success": False
                 }
             
-            with open(filepath, 'r') as f:
-                state = json.load(f)
+            state = loads(filepath.read_bytes())
             
             self.current_state = state
             
@@ -170,15 +226,8 @@ class GameStateManager:
             }
         
         # Deep merge updates
-        def deep_update(base: Dict, updates: Dict):
-            for key, value in updates.items():
-                if isinstance(value, dict) and key in base and isinstance(base[key], dict):
-                    deep_update(base[key], value)
-                else:
-                    base[key] = value
-        
-        deep_update(self.current_state, updates)
-        self.current_state["last_updated"] = datetime.now().isoformat()
+        _deep_update(self.current_state, updates)
+        self.current_state["last_updated"] = self._now_iso()
         
         return {
             "state": self.current_state,
@@ -201,11 +250,14 @@ class GameStateManager:
                 "success": False
             }
         
-        if "session_history" not in self.current_state:
-            self.current_state["session_history"] = []
+        history = self.current_state.get("session_history")
+        if not isinstance(history, deque):
+            # Missing, or a plain list from a loaded save or an update
+            history = deque(history or (), maxlen=SESSION_HISTORY_MAX_ENTRIES)
+            self.current_state["session_history"] = history
         
-        timestamp = datetime.now().isoformat()
-        self.current_state["session_history"].append({
+        timestamp = self._now_iso()
+        history.append({
             "timestamp": timestamp,
             "entry": entry
         })
@@ -227,35 +279,40 @@ class GameStateManager:
         """
         try:
             saves = []
-            for filepath in self.save_directory.glob("*.json"):
-                try:
-                    with open(filepath, 'r') as f:
-                        save_data = json.load(f)
-                        char_name = save_data.get("character", {}).get("name", "Unknown")
-                        last_updated = save_data.get("last_updated", "Unknown")
-                        save_slot = save_data.get("save_slot", None)
+            previous_cache = self._save_cache
+            cache: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+            with os.scandir(self.save_directory) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if not name.endswith('.json') or name.endswith(META_SUFFIX):
+                        continue
+                    try:
+                        if not entry.is_file():
+                            continue
+                        mtime = entry.stat().st_mtime_ns
+                        cached = previous_cache.get(name)
+                        if cached is not None and cached[0] == mtime:
+                            metadata = cached[1]
+                        else:
+                            metadata = self._read_metadata(Path(entry.path), mtime)
+                        cache[name] = (mtime, metadata)
                         
                         # Filter by slot if specified
-                        if slot_filter is not None and save_slot != slot_filter:
+                        if slot_filter is not None and metadata.get("save_slot") != slot_filter:
                             continue
                         
+                        saves.append({"filename": name, **metadata})
+                    except:
                         saves.append({
-                            "filename": filepath.name,
-                            "character": char_name,
-                            "last_updated": last_updated,
-                            "location": save_data.get("current_location", "Unknown"),
-                            "save_slot": save_slot,
-                            "level": save_data.get("character", {}).get("level", 1),
-                            "playtime": save_data.get("playtime_minutes", 0)
+                            "filename": name,
+                            "character": "Unknown",
+                            "last_updated": "Unknown",
+                            "location": "Unknown",
+                            "save_slot": None
                         })
-                except:
-                    saves.append({
-                        "filename": filepath.name,
-                        "character": "Unknown",
-                        "last_updated": "Unknown",
-                        "location": "Unknown",
-                        "save_slot": None
-                    })
+            
+            # Replacing the cache drops entries for deleted saves
+            self._save_cache = cache
             
             # Sort by last updated (most recent first)
             saves.sort(key=lambda x: x.get("last_updated", ""), reverse=True)
@@ -272,6 +329,23 @@ class GameStateManager:
                 "success": False
             }
     
+    def _read_metadata(self, path: Path, mtime_ns: int) -> Dict[str, Any]:
+        """
+        Read list_saves metadata for one save file.
+        
+        Uses the save's metadata file when it is at least as new as the save
+        (mtime_ns), and falls back to parsing the full save (older saves, or
+        files written by other tools).
+        """
+        meta_path = path.with_suffix(META_SUFFIX)
+        try:
+            if meta_path.stat().st_mtime_ns >= mtime_ns:
+                return loads(meta_path.read_bytes())
+        except FileNotFoundError:
+            pass
+        
+        return _save_metadata(loads(path.read_bytes()))
+    
     def save_to_slot(self, state: Optional[Dict[str, Any]] = None, 
                     slot_number: int = 1) -> Dict[str, Any]:
         """
@@ -299,7 +373,7 @@ class GameStateManager:
         
         # Add save slot info
         state_to_save["save_slot"] = slot_number
-        state_to_save["last_updated"] = datetime.now().isoformat()
+        state_to_save["last_updated"] = self._now_iso()
         
         # Generate filename with slot number
         char_name = state_to_save.get("character", {}).get("name", "unknown")
@@ -3,10 +3,102 @@ Game Master Agent - Tools Module
 Contains all game mechanics tools that the agent can use.
 """
 
+import os
 import random
-import json
-from typing import Dict, Any, Optional, List
+import re
+from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
+from types import MappingProxyType
+
+from src._serde import dumpb, loads, write_atomic
+from src.state_manager import META_SUFFIX
+
+
+# Ability modifiers for the standard 0-30 score range
+ABILITY_MODIFIERS = tuple((score - 10) // 2 for score in range(31))
+
+
+# Dice notation: [count]d[sides][+/-modifier], spaces allowed between parts
+_DICE_RE = re.compile(r"^\s*(\d*)\s*d\s*(\d+)\s*(?:([+-])\s*(\d+))?\s*$", re.IGNORECASE)
+
+
+# Die faces for batched rolls in simulate_attacks
+_D20_FACES = range(1, 21)
+_D8_FACES = range(1, 9)
+
+
+# Prefixes that turn a string value into an add/subtract in update_character_stat
+_PLUS_MINUS = frozenset(("+", "-"))
+_STAT_OPS = frozenset(("=", "+", "-"))
+
+
+# Ability used by each skill (unknown skills fall back to intelligence)
+_SKILL_TO_STAT = MappingProxyType({
+    "athletics": "strength",
+    "acrobatics": "dexterity",
+    "stealth": "dexterity",
+    "perception": "wisdom",
+    "investigation": "intelligence",
+    "insight": "wisdom",
+    "persuasion": "charisma",
+    "intimidation": "charisma",
+    "deception": "charisma",
+    "arcana": "intelligence",
+    "history": "intelligence",
+    "nature": "intelligence",
+    "religion": "intelligence",
+    "medicine": "wisdom",
+    "survival": "wisdom",
+    "sleight_of_hand": "dexterity",
+    "performance": "charisma"
+})
+
+
+def ability_modifier(score: int) -> int:
+    """
+    Get the ability modifier for an ability score.
+    
+    Args:
+        score: Ability score
+    
+    Returns:
+        Modifier, read from ABILITY_MODIFIERS for int scores in 0-30
+    """
+    # Scores from JSON or tool-call arguments may be floats; compute those directly
+    if type(score) is int and 0 <= score <= 30:
+        return ABILITY_MODIFIERS[score]
+    return (score - 10) // 2
+
+
+def _fast_roll(sides: int, count: int = 1, modifier: int = 0) -> Tuple[List[int], int]:
+    """
+    Roll dice without parsing notation or building a result dictionary.
+    
+    Returns:
+        (individual rolls, total including modifier)
+    """
+    # One choices() call draws a whole batch; randint is cheaper for one die
+    if count == 1:
+        rolls = [random.randint(1, sides)]
+    else:
+        if sides < 1:
+            raise ValueError(f"Invalid number of sides: {sides}")
+        rolls = random.choices(range(1, sides + 1), k=count)
+    return rolls, sum(rolls) + modifier
+
+
+def _roll_result(notation: str, count: int, sides: int, modifier: int,
+                 rolls: List[int], total: int) -> Dict[str, Any]:
+    """Build the roll_dice result dictionary for a completed roll."""
+    return {
+        "notation": notation,
+        "count": count,
+        "sides": sides,
+        "modifier": modifier,
+        "rolls": rolls,
+        "total": total,
+        "success": True
+    }
 
 
 def roll_dice(notation: str) -> Dict[str, Any]:
@@ -21,41 +113,21 @@ def roll_dice(notation: str) -> Dict[str, Any]:
     """
     try:
         # Parse notation: [count]d[sides][+/-modifier]
-        parts = notation.lower().replace(' ', '').split('d')
-        if len(parts) != 2:
+        match = _DICE_RE.match(notation)
+        if match is None:
             raise ValueError(f"Invalid dice notation: {notation}")
         
-        count = int(parts[0]) if parts[0] else 1
-        rest = parts[1]
+        count_str, sides_str, sign, mod = match.groups()
+        count = int(count_str) if count_str else 1
+        sides = int(sides_str)
         
         # Extract modifier
         modifier = 0
-        if '+' in rest:
-            sides, mod = rest.split('+')
-            modifier = int(mod)
-        elif '-' in rest:
-            sides, mod = rest.split('-')
-            modifier = -int(mod)
-        else:
-            sides = rest
-        
-        sides = int(sides)
-        
-        # Roll dice
-        rolls = [random.randint(1, sides) for _ in range(count)]
-        total = sum(rolls) + modifier
-        
-        result = {
-            "notation": notation,
-            "count": count,
-            "sides": sides,
-            "modifier": modifier,
-            "rolls": rolls,
-            "total": total,
-            "success": True
-        }
+        if mod is not None:
+            modifier = int(mod) if sign == '+' else -int(mod)
         
-        return result
+        rolls, total = _fast_roll(sides, count, modifier)
+        return _roll_result(notation, count, sides, modifier, rolls, total)
         
     except Exception as e:
         return {
@@ -65,6 +137,31 @@ def roll_dice(notation: str) -> Dict[str, Any]:
         }
 
 
+def _attack_numbers(attacker: Dict[str, Any], defender: Dict[str, Any]) -> Tuple[int, int, int]:
+    """
+    Get the fixed numbers of an attack.
+    
+    Returns:
+        (damage modifier, attack bonus, defender AC)
+    """
+    # Get attack bonus from strength or dexterity
+    attack_stat = attacker.get("stats", {})
+    str_mod = ability_modifier(attack_stat.get("strength", 10))
+    dex_mod = ability_modifier(attack_stat.get("dexterity", 10))
+    stat_mod = max(str_mod, dex_mod)  # also the damage bonus
+    attack_bonus = stat_mod + attacker.get("level", 1)
+    
+    # Get AC (Armor Class)
+    if "ac" in defender:
+        defender_ac = defender["ac"]
+    else:
+        # Calculate AC from stats
+        dex_mod_def = ability_modifier(defender.get("stats", {}).get("dexterity", 10))
+        defender_ac = 10 + dex_mod_def
+    
+    return stat_mod, attack_bonus, defender_ac
+
+
 def perform_attack(attacker: Dict[str, Any], defender: Dict[str, Any], 
                    weapon: Optional[str] = None) -> Dict[str, Any]:
     """
@@ -79,38 +176,27 @@ def perform_attack(attacker: Dict[str, Any], defender: Dict[str, Any],
         Dictionary with attack roll, hit status, and damage
     """
     try:
-        # Get attack bonus from strength or dexterity
-        attack_stat = attacker.get("stats", {})
-        str_mod = (attack_stat.get("strength", 10) - 10) // 2
-        dex_mod = (attack_stat.get("dexterity", 10) - 10) // 2
-        attack_bonus = max(str_mod, dex_mod) + attacker.get("level", 1)
+        stat_mod, attack_bonus, defender_ac = _attack_numbers(attacker, defender)
         
         # Roll attack
-        attack_roll = roll_dice("1d20")
-        attack_total = attack_roll["total"] + attack_bonus
-        
-        # Get AC (Armor Class)
-        defender_ac = defender.get("ac", 10)
-        if "ac" not in defender:
-            # Calculate AC from stats
-            dex_mod_def = (defender.get("stats", {}).get("dexterity", 10) - 10) // 2
-            defender_ac = 10 + dex_mod_def
+        rolls, d20 = _fast_roll(20)
+        attack_roll = _roll_result("1d20", 1, 20, 0, rolls, d20)
+        attack_total = d20 + attack_bonus
         
         # Check if hit
         hit = attack_total >= defender_ac
-        critical = attack_roll["rolls"][0] == 20
+        critical = d20 == 20
         
         # Calculate damage
         damage = 0
         if hit:
-            # Base damage from weapon (1d8 for most weapons)
-            damage_roll = roll_dice("1d8")
-            damage = damage_roll["total"] + max(str_mod, dex_mod)
+            # Base damage from weapon (1d8 for most weapons); only the totals
+            # are reported, so roll directly instead of going through roll_dice
+            damage = random.randint(1, 8) + stat_mod
             
             if critical:
-                damage = damage * 2
-                damage_roll = roll_dice("2d8")
-                damage = damage_roll["total"] + max(str_mod, dex_mod) * 2
+                # Critical hits roll a second die and add the modifier again
+                damage += random.randint(1, 8) + stat_mod
         
         result = {
             "attacker": attacker.get("name", "Unknown"),
@@ -135,6 +221,61 @@ def perform_attack(attacker: Dict[str, Any], defender: Dict[str, Any],
         }
 
 
+def simulate_attacks(attacker: Dict[str, Any], defender: Dict[str, Any],
+                     trials: int = 1000, seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Simulate many attacks to estimate hit rate and damage, e.g. for balancing.
+    
+    Uses the same rules as perform_attack, but draws all d20s and damage dice
+    in batches and builds no per-attack results.
+    
+    Args:
+        attacker: Character dictionary with stats
+        defender: Character dictionary with stats
+        trials: Number of attacks to simulate
+        seed: Optional seed for reproducible results
+    
+    Returns:
+        Dictionary with hit counts, hit rate, and damage totals
+    """
+    try:
+        if trials < 1:
+            raise ValueError("trials must be at least 1")
+        
+        rng = random.Random(seed) if seed is not None else random
+        stat_mod, attack_bonus, defender_ac = _attack_numbers(attacker, defender)
+        
+        # An attack hits when d20 + attack_bonus >= AC; a hit on a natural 20
+        # is critical and rolls a second damage die with the modifier again
+        d20s = rng.choices(_D20_FACES, k=trials)
+        needed = defender_ac - attack_bonus
+        hits = sum(1 for d20 in d20s if d20 >= needed)
+        critical_hits = d20s.count(20) if needed <= 20 else 0
+        
+        damage_dice = hits + critical_hits
+        total_damage = sum(rng.choices(_D8_FACES, k=damage_dice)) + stat_mod * damage_dice
+        
+        return {
+            "attacker": attacker.get("name", "Unknown"),
+            "defender": defender.get("name", "Unknown"),
+            "defender_ac": defender_ac,
+            "attack_bonus": attack_bonus,
+            "trials": trials,
+            "hits": hits,
+            "critical_hits": critical_hits,
+            "hit_rate": hits / trials,
+            "total_damage": total_damage,
+            "average_damage": total_damage / trials,
+            "success": True
+        }
+        
+    except Exception as e:
+        return {
+            "error": str(e),
+            "success": False
+        }
+
+
 def skill_check(skill: str, difficulty: int, modifiers: Dict[str, Any]) -> Dict[str, Any]:
     """
     Perform a skill check against a difficulty class (DC).
@@ -150,44 +291,25 @@ def skill_check(skill: str, difficulty: int, modifiers: Dict[str, Any]) -> Dict[
     try:
         # Get relevant stat modifier
         stats = modifiers.get("stats", {})
-        skill_to_stat = {
-            "athletics": "strength",
-            "acrobatics": "dexterity",
-            "stealth": "dexterity",
-            "perception": "wisdom",
-            "investigation": "intelligence",
-            "insight": "wisdom",
-            "persuasion": "charisma",
-            "intimidation": "charisma",
-            "deception": "charisma",
-            "arcana": "intelligence",
-            "history": "intelligence",
-            "nature": "intelligence",
-            "religion": "intelligence",
-            "medicine": "wisdom",
-            "survival": "wisdom",
-            "sleight_of_hand": "dexterity",
-            "performance": "charisma"
-        }
-        
-        stat_name = skill_to_stat.get(skill.lower(), "intelligence")
+        skill_key = skill.lower()
+        stat_name = _SKILL_TO_STAT.get(skill_key, "intelligence")
         stat_value = stats.get(stat_name, 10)
-        stat_modifier = (stat_value - 10) // 2
+        stat_modifier = ability_modifier(stat_value)
         
         # Proficiency bonus (if applicable)
-        proficiency = modifiers.get("level", 1) // 4 + 1
         skills = modifiers.get("skills", {})
-        if skill.lower() in [s.lower() for s in skills.get("proficient", [])]:
-            stat_modifier += proficiency
+        if any(s.lower() == skill_key for s in skills.get("proficient", ())):
+            stat_modifier += modifiers.get("level", 1) // 4 + 1
         
         # Roll d20
-        roll = roll_dice("1d20")
-        total = roll["total"] + stat_modifier
+        rolls, d20 = _fast_roll(20)
+        roll = _roll_result("1d20", 1, 20, 0, rolls, d20)
+        total = d20 + stat_modifier
         
         # Check success
         success = total >= difficulty
-        critical_success = roll["rolls"][0] == 20
-        critical_failure = roll["rolls"][0] == 1
+        critical_success = d20 == 20
+        critical_failure = d20 == 1
         
         result = {
             "skill": skill,
@@ -211,50 +333,55 @@ def skill_check(skill: str, difficulty: int, modifiers: Dict[str, Any]) -> Dict[
         }
 
 
-def update_character_stat(character: Dict[str, Any], stat: str, value: Any) -> Dict[str, Any]:
+def update_character_stat(character: Dict[str, Any], stat: str, value: Any,
+                          op: str = "=") -> Dict[str, Any]:
     """
     Update a character's stat (HP, stats, inventory, etc.).
     
     Args:
         character: Character dictionary
         stat: Stat name (e.g., "hp", "stats.strength", "inventory")
-        value: New value or value to add/subtract
+        value: New value, or amount to add/subtract
+        op: "=" to set, "+" to add or "-" to subtract; with "=", a string
+            value like "+10" or "-5" is still read as an add/subtract
     
     Returns:
         Updated character dictionary
     """
+    if op not in _STAT_OPS:
+        return {
+            "error": f"Unknown op: {op!r} (expected '=', '+' or '-')",
+            "success": False
+        }
+    
     try:
-        character = character.copy()
-        
-        # Handle nested stats (e.g., "stats.strength", "hp.current")
-        if '.' in stat:
-            parts = stat.split('.')
-            current = character
-            for part in parts[:-1]:
-                if part not in current:
-                    current[part] = {}
-                current = current[part]
-            
-            # Handle operations
-            if isinstance(value, str) and value.startswith(('+', '-')):
-                op = value[0]
-                val = int(value[1:])
-                current[parts[-1]] = current.get(parts[-1], 0) + (val if op == '+' else -val)
-            else:
-                current[parts[-1]] = value
+        new_value = value
+        if op == "=" and isinstance(value, str) and value[:1] in _PLUS_MINUS:
+            op, value = value[0], int(value[1:])
+        
+        # Copy only the dicts along the stat's path (e.g. "stats.strength",
+        # "hp.current"), so the caller's character is left untouched while
+        # unrelated branches are shared
+        parts = stat.split('.')
+        character = {**character}
+        current = character
+        for part in parts[:-1]:
+            current[part] = {**current.get(part, {})}
+            current = current[part]
+        key = parts[-1]
+        
+        # Handle operations
+        if op == "+":
+            current[key] = current.get(key, 0) + value
+        elif op == "-":
+            current[key] = current.get(key, 0) - value
         else:
-            # Handle top-level stats
-            if isinstance(value, str) and value.startswith(('+', '-')):
-                op = value[0]
-                val = int(value[1:])
-                character[stat] = character.get(stat, 0) + (val if op == '+' else -val)
-            else:
-                character[stat] = value
+            current[key] = value
         
         return {
             "character": character,
             "updated_stat": stat,
-            "new_value": value,
+            "new_value": new_value,
             "success": True
         }
         
@@ -265,13 +392,14 @@ def update_character_stat(character: Dict[str, Any], stat: str, value: Any) -> D
         }
 
 
-def save_game(state: Dict[str, Any], filename: str) -> Dict[str, Any]:
+def save_game(state: Dict[str, Any], filename: str, pretty: bool = False) -> Dict[str, Any]:
     """
     Save game state to a JSON file.
     
     Args:
         state: Game state dictionary
         filename: Filename to save to (will be saved in data/saves/)
+        pretty: Write indented JSON for debugging (compact by default)
     
     Returns:
         Dictionary with save status
@@ -286,8 +414,7 @@ def save_game(state: Dict[str, Any], filename: str) -> Dict[str, Any]:
         
         filepath = save_dir / filename
         
-        with open(filepath, 'w') as f:
-            json.dump(state, f, indent=2)
+        write_atomic(filepath, dumpb(state, indent=pretty))
         
         return {
             "filename": filename,
@@ -330,8 +457,7 @@ def load_game(filename: str) -> Dict[str, Any]:
                 "success": False
             }
         
-        with open(filepath, 'r') as f:
-            state = json.load(f)
+        state = loads(filepath.read_bytes())
         
         return {
             "filename": filename,
@@ -359,7 +485,12 @@ def list_saved_games() -> Dict[str, Any]:
         save_dir = Path("data/saves")
         save_dir.mkdir(parents=True, exist_ok=True)
         
-        saves = [f.name for f in save_dir.glob("*.json")]
+        with os.scandir(save_dir) as entries:
+            saves = [
+                entry.name for entry in entries
+                if entry.name.endswith('.json') and not entry.name.endswith(META_SUFFIX)
+                and entry.is_file()
+            ]
         
         return {
             "saves": saves,
@@ -0,0 +1,9 @@
+"""
+Pytest configuration: make the repository root importable so tests can use
+the src package without installing it.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
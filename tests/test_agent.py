@@ -2,31 +2,33 @@
 Basic tests for the Game Master Agent.
 """
 
-import sys
-from pathlib import Path
+import os
+from collections import deque
+from datetime import datetime
 
-# Add src to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
+import pytest
 
-from src.tools import roll_dice, skill_check
+from src import _serde
+from src._serde import dumpb, loads, write_atomic
+from src.tools import ability_modifier, perform_attack, roll_dice, skill_check, simulate_attacks, update_character_stat
 from src.character import create_character, get_character_summary
 from src.content_generator import generate_npc, create_quest
-from src.state_manager import GameStateManager
+from src.state_manager import GameStateManager, META_SUFFIX, SESSION_HISTORY_MAX_ENTRIES
+from src.achievements import Achievement, AchievementsSystem
+from src.combat_system import CombatManager, create_enemy
+from src.reputation import ReputationSystem
 
 
 def test_dice_rolling():
     """Test dice rolling functionality."""
-    print("Testing dice rolling...")
     result = roll_dice("1d20")
     assert result.get("success"), "Dice roll should succeed"
     assert "total" in result, "Result should have total"
     assert 1 <= result["total"] <= 20, "d20 should be between 1 and 20"
-    print("✅ Dice rolling works!")
 
 
 def test_character_creation():
     """Test character creation."""
-    print("Testing character creation...")
     character = create_character(
         name="Test Hero",
         race="human",
@@ -35,13 +37,11 @@ def test_character_creation():
     assert character["name"] == "Test Hero", "Character name should match"
     assert character["level"] == 1, "Character should start at level 1"
     assert "hp" in character, "Character should have HP"
-    print("✅ Character creation works!")
-    print(get_character_summary(character))
+    assert "Test Hero" in get_character_summary(character), "Summary should name the character"
 
 
 def test_skill_check():
     """Test skill check system."""
-    print("Testing skill checks...")
     modifiers = {
         "stats": {"wisdom": 14},
         "level": 1,
@@ -49,68 +49,257 @@ def test_skill_check():
     }
     result = skill_check("perception", difficulty=12, modifiers=modifiers)
     assert result.get("success") is not None, "Skill check should return success status"
-    print("✅ Skill checks work!")
 
 
 def test_npc_generation():
     """Test NPC generation."""
-    print("Testing NPC generation...")
     result = generate_npc(
         context="A test scenario",
         role="tavern_owner"
     )
     assert result.get("success"), "NPC generation should succeed"
     assert "npc" in result, "Result should contain NPC"
-    print("✅ NPC generation works!")
 
 
 def test_quest_creation():
     """Test quest creation."""
-    print("Testing quest creation...")
     result = create_quest(
         difficulty="medium",
         theme="the_cursed_tavern"
     )
     assert result.get("success"), "Quest creation should succeed"
     assert "quest" in result, "Result should contain quest"
-    print("✅ Quest creation works!")
 
 
 def test_state_management():
     """Test state management."""
-    print("Testing state management...")
     state_manager = GameStateManager()
     character = create_character("Test", "elf", "ranger")
     state = state_manager.create_initial_state(character)
     assert state is not None, "State should be created"
     assert state["character"]["name"] == "Test", "State should contain character"
-    print("✅ State management works!")
-
-
-if __name__ == "__main__":
-    print("=" * 60)
-    print("Running Game Master Agent Tests")
-    print("=" * 60)
-    print()
-    
-    try:
-        test_dice_rolling()
-        print()
-        test_character_creation()
-        print()
-        test_skill_check()
-        print()
-        test_npc_generation()
-        print()
-        test_quest_creation()
-        print()
-        test_state_management()
-        print()
-        print("=" * 60)
-        print("✅ All tests passed!")
-        print("=" * 60)
-    except Exception as e:
-        print(f"❌ Test failed: {e}")
-        import traceback
-        traceback.print_exc()
 
+
+def test_achievements():
+    """Test milestone achievements and save/load round trip."""
+    achievements = AchievementsSystem()
+    achievements.update_milestone("enemies_defeated", 10)
+    unlocked = [a.id for a in achievements.get_achievements_by_category()]
+    assert unlocked == ["first_blood", "warrior"], "Crossing two tiers should unlock both"
+    
+    restored = AchievementsSystem()
+    restored.from_dict(achievements.to_dict())
+    assert restored.get_statistics()["by_category"] == {"milestone": 2}, "Counts should survive a round trip"
+    assert not restored.unlock_achievement("warrior", "Warrior", "")["success"], "Restored IDs should block re-unlocks"
+
+
+def test_combat_skips_defeated():
+    """Test that defeated combatants lose their turns."""
+    player = create_character("Hero", "human", "fighter")
+    goblin = create_enemy("Goblin", "goblin")
+    orc = create_enemy("Orc", "orc")
+    combat = CombatManager()
+    combat.start_combat(player, [goblin, orc])
+    
+    goblin["hp"]["current"] = 1
+    combat.apply_condition("Goblin", "bleeding")
+    combat.process_conditions("Goblin", goblin)
+    
+    turns = [combat.next_turn()["current_combatant"] for _ in range(4)]
+    assert "Goblin" not in turns, "Defeated combatants should be skipped"
+    assert combat.check_combat_status()["enemies_remaining"] == 1, "Only the orc should remain"
+
+
+def test_reputation_freeze():
+    """Test that frozen faction reputations behave like the dict form."""
+    reputation = ReputationSystem()
+    reputation.modify_reputation(faction="Guild", amount=30)
+    reputation.modify_reputation(faction="Crown", amount=-10)
+    reputation.freeze()
+    
+    result = reputation.modify_reputation(faction="Guild", amount=90)
+    assert result["new_reputation"] == 100, "Frozen updates should still clamp"
+    assert reputation.get_faction_reputation("Crown") == -10, "Frozen lookups should find factions"
+    assert reputation.get_faction_reputation("Cult") == 0, "Unknown factions should default to 0"
+    
+    reputation.modify_reputation(faction="Cult", amount=5)
+    assert not reputation.frozen, "A new faction should unfreeze"
+    assert reputation.faction_reputations == {"Guild": 100, "Crown": -10, "Cult": 5}
+
+
+def test_simulate_attacks():
+    """Test batched attack simulation."""
+    attacker = create_character("Hero", "human", "fighter")
+    result = simulate_attacks(attacker, {"ac": 14}, trials=2000, seed=7)
+    assert result["success"], "Simulation should succeed"
+    assert 0 < result["hits"] < 2000, "Some attacks should hit and some miss"
+    assert result["critical_hits"] <= result["hits"], "Critical hits are a subset of hits"
+    assert simulate_attacks(attacker, {"ac": 14}, trials=2000, seed=7) == result, "Seeded runs should repeat"
+    assert simulate_attacks(attacker, {"ac": 40}, trials=100)["hits"] == 0, "Unreachable AC should never be hit"
+
+
+def test_write_atomic_keeps_old_file_on_failure(tmp_path, monkeypatch):
+    """Test that a failed atomic write leaves the previous file intact."""
+    path = tmp_path / "save.json"
+    write_atomic(path, b'{"v":1}')
+    
+    def fail_replace(src, dst):
+        raise OSError("disk full")
+    monkeypatch.setattr(os, "replace", fail_replace)
+    
+    with pytest.raises(OSError):
+        write_atomic(path, b'{"v":2}')
+    assert path.read_bytes() == b'{"v":1}', "The old contents should survive a failed write"
+    assert list(tmp_path.iterdir()) == [path], "The temporary file should be removed"
+
+
+def test_save_writes_metadata_sidecar(tmp_path):
+    """Test that saves write a metadata file that list_saves reports."""
+    state_manager = GameStateManager(str(tmp_path))
+    state_manager.create_initial_state(create_character("Aria", "elf", "ranger"))
+    assert state_manager.save_state(filename="aria")["success"], "Save should succeed"
+    
+    metadata = loads((tmp_path / ("aria" + META_SUFFIX)).read_bytes())
+    assert metadata["character"] == "Aria", "Metadata should name the character"
+    assert metadata["level"] == 1, "Metadata should record the level"
+    assert not list(tmp_path.glob("*.tmp")), "No temporary files should be left behind"
+    
+    saves = state_manager.list_saves()["saves"]
+    assert [s["filename"] for s in saves] == ["aria.json"], "Metadata files should not be listed as saves"
+    assert saves[0]["character"] == "Aria", "list_saves should read the metadata"
+
+
+def test_list_saves_cache_and_stale_metadata(tmp_path):
+    """Test list_saves caching by mtime and the fallback for stale metadata files."""
+    state_manager = GameStateManager(str(tmp_path))
+    state_manager.create_initial_state(create_character("Aria", "elf", "ranger"))
+    state_manager.save_state(filename="aria")
+    state_manager.list_saves()
+    
+    # An unchanged save is served from the cache, even if its metadata file breaks
+    meta_path = tmp_path / ("aria" + META_SUFFIX)
+    meta_path.write_text("not json")
+    assert state_manager.list_saves()["saves"][0]["character"] == "Aria", "Cached metadata should be reused"
+    
+    # A save newer than its metadata file is parsed in full
+    save_path = tmp_path / "aria.json"
+    state = loads(save_path.read_bytes())
+    state["character"]["name"] = "Brom"
+    write_atomic(save_path, dumpb(state))
+    stale_ns = save_path.stat().st_mtime_ns - 10**9
+    os.utime(meta_path, ns=(stale_ns, stale_ns))
+    assert state_manager.list_saves()["saves"][0]["character"] == "Brom", "Stale metadata should be ignored"
+    
+    save_path.unlink()
+    assert state_manager.list_saves()["count"] == 0, "Deleted saves should disappear"
+    assert state_manager._save_cache == {}, "Deleted saves should leave the cache"
+
+
+def test_session_history_round_trip(tmp_path):
+    """Test that session history survives a save and stays bounded after loading."""
+    state_manager = GameStateManager(str(tmp_path))
+    state_manager.create_initial_state(create_character("Aria", "elf", "ranger"))
+    state_manager.add_to_history("Arrived in town")
+    state_manager.save_state(filename="aria")
+    
+    loaded = GameStateManager(str(tmp_path))
+    assert loaded.load_state("aria")["success"], "Load should succeed"
+    loaded.add_to_history("Entered the tavern")
+    
+    history = loaded.get_current_state()["session_history"]
+    assert isinstance(history, deque), "Loaded history should become a deque again"
+    assert history.maxlen == SESSION_HISTORY_MAX_ENTRIES, "Loaded history should stay bounded"
+    assert [h["entry"] for h in history] == ["Arrived in town", "Entered the tavern"]
+
+
+def test_update_character_stat_ops():
+    """Test the set/add/subtract operations of update_character_stat."""
+    character = {"hp": {"current": 10, "max": 12}, "gold": 5}
+    
+    assert update_character_stat(character, "hp.current", 3, op="-")["character"]["hp"]["current"] == 7
+    assert update_character_stat(character, "gold", 4, op="+")["character"]["gold"] == 9
+    assert update_character_stat(character, "gold", "+2")["character"]["gold"] == 7, "Signed strings should add"
+    assert update_character_stat(character, "gold", 1)["character"]["gold"] == 1
+    assert character == {"hp": {"current": 10, "max": 12}, "gold": 5}, "The input should not be modified"
+    
+    result = update_character_stat(character, "gold", 2, op="*")
+    assert not result["success"], "Unknown operations should be rejected"
+
+
+def test_reputation_freeze_round_trip_and_history_limit():
+    """Test freeze/unfreeze round trips and the bounded reputation history."""
+    reputation = ReputationSystem(max_history=3)
+    for amount in (10, 20, 30, 40.0):
+        reputation.modify_reputation(faction="Guild", amount=amount)
+    reputation.modify_reputation(faction="Crown", amount=-5)
+    
+    history = reputation.reputation_history
+    assert [h["change"] for h in history] == [30, 40, -5], "Only the newest entries should be kept"
+    
+    reputation.freeze()
+    with pytest.raises(TypeError):
+        reputation.faction_reputations["Guild"] = 0
+    assert reputation.get_faction_reputation("Guild") == 100, "Frozen values should be unchanged"
+    
+    reputation.unfreeze()
+    assert reputation.faction_reputations == {"Crown": -5, "Guild": 100}, "Unfreezing should restore the dict"
+    
+    restored = ReputationSystem(max_history=3)
+    restored.from_dict(reputation.to_dict(compact=True))
+    assert restored.reputation_history == history, "Compact history should round-trip"
+    assert restored.faction_reputations == {"Crown": -5, "Guild": 100}
+
+
+def test_float_ability_scores():
+    """Test that float ability scores, as parsed from JSON, still work."""
+    assert ability_modifier(16.0) == ability_modifier(16) == 3, "Float scores should match int scores"
+    assert ability_modifier(7.0) == -2
+    assert "hit" in perform_attack({"stats": {"strength": 16.0}}, {"ac": 12}), "Attacks should accept float stats"
+    character = create_character("Aria", "elf", "ranger", stats={"dexterity": 15.0, "constitution": 14.0})
+    assert character["hp"]["max"] > 0, "Characters should accept float stats"
+
+
+def test_reputation_round_trip_is_independent():
+    """Test that a system loaded from another's to_dict() does not share its dicts."""
+    original = ReputationSystem()
+    original.modify_reputation(faction="Guild", amount=10)
+    original.modify_reputation(npc_name="Brenna", amount=10)
+    
+    restored = ReputationSystem()
+    restored.from_dict(original.to_dict())
+    restored.modify_reputation(faction="Guild", amount=50)
+    restored.modify_reputation(npc_name="Brenna", amount=50)
+    
+    assert original.get_faction_reputation("Guild") == 10, "Faction changes should not leak back"
+    assert original.get_npc_reputation("Brenna") == 10, "NPC changes should not leak back"
+
+
+def test_combat_refresh_hp_revives_healed_enemies():
+    """Test that refresh_hp picks up HP changed outside the combat manager."""
+    player = create_character("Hero", "human", "fighter")
+    goblin = create_enemy("Goblin", "goblin")
+    combat = CombatManager()
+    combat.start_combat(player, [goblin])
+    
+    goblin["hp"]["current"] = 0
+    combat.refresh_hp()
+    assert combat.check_combat_status()["victory"], "A downed enemy should end combat"
+    
+    goblin["hp"]["current"] = 5
+    combat.combat_active = True
+    combat.refresh_hp()
+    assert combat.check_combat_status()["enemies_remaining"] == 1, "A healed enemy should count again"
+
+
+def test_serde_backends_match(monkeypatch):
+    """Test that the stdlib fallback encodes the same objects as orjson would."""
+    data = {
+        "achievement": Achievement("id", "Name", "Description", "general", ""),
+        "history": deque(["Ärger im Wirtshaus"]),
+        "when": datetime(2026, 1, 2, 3, 4, 5)
+    }
+    compact, indented = _serde.dumps(data), _serde.dumps(data, indent=True)
+    monkeypatch.setattr(_serde, "orjson", None)
+    assert _serde.dumps(data) == compact, "Compact output should not depend on the backend"
+    assert _serde.dumps(data, indent=True) == indented, "Indented output should not depend on the backend"
+    assert "Ärger" in indented, "Non-ASCII text should not be escaped"